@@ -9,6 +9,10 @@ import requests
 from schema.block import DocNode
 from schema.tiptap_models import TiptapNode
 
+# One session for every call, so the connection to the server is kept alive
+_SESSION = requests.Session()
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 def update_document(
     doc: DocNode, server_url: str = "http://localhost:8000"
@@ -24,10 +28,11 @@ def update_document(
         Response from the server
     """
     url = f"{server_url}/api/update-doc"
-    payload = {"doc": doc.model_dump_json()}
+    # Nodes serialize straight to JSON, so the body is built without a dict round-trip
+    payload = '{"doc":' + doc.model_dump_json() + "}"
 
     try:
-        response = requests.post(url, json=payload)
+        response = _SESSION.post(url, data=payload.encode(), headers=_JSON_HEADERS)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -49,12 +54,12 @@ def append_to_document(
     """
     url = f"{server_url}/api/append-to-doc"
 
-    payload = {"new_nodes": [c.model_dump_json() for c in content]}
+    payload = '{"new_nodes":[' + ",".join(c.model_dump_json() for c in content) + "]}"
 
-    print(f"New content: {payload}")
+    print(f"➕ Appending {len(content)} nodes to the live view")
 
     try:
-        response = requests.post(url, json=payload)
+        response = _SESSION.post(url, data=payload.encode(), headers=_JSON_HEADERS)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
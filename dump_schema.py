@@ -1,11 +1,17 @@
+import functools
+import hashlib
 import importlib
 import os
 import pkgutil
-from typing import Union
+import sys
+from pathlib import Path
+from typing import Union, get_args
 from uuid import UUID
 
+import orjson
+import pydantic
 from dotenv import load_dotenv
-from pydantic import TypeAdapter
+from pydantic import BaseModel, TypeAdapter
 from supabase import Client, create_client
 
 import schema
@@ -19,32 +25,106 @@ key: str = os.environ.get("SUPABASE_KEY")
 supabase: Client = create_client(url, key)
 
 COLLECTION_NAME = "Williston Town Plan"
+PROJECT_ROOT = Path(__file__).resolve().parent
+SCHEMA_CACHE_DIR = PROJECT_ROOT / ".cache"
 
 
-def get_all_subclasses(cls):
-    """Recursively find all subclasses of a given class."""
+@functools.cache
+def import_schema_modules():
+    """
+    Import all modules in the 'schema' package to register all Block subclasses.
+    Only the first call walks the package.
+    """
+    for _, module_name, _ in pkgutil.walk_packages(
+        schema.__path__, schema.__name__ + "."
+    ):
+        importlib.import_module(module_name)
+
+
+@functools.cache
+def get_all_subclasses(cls) -> tuple[type, ...]:
+    """
+    Find all subclasses of a given class, depth first. The class hierarchy doesn't
+    change once the schema modules are imported, so the result is cached.
+    """
     all_subclasses = []
-    for subclass in cls.__subclasses__():
+    seen = set()
+    stack = list(reversed(cls.__subclasses__()))
+    while stack:
+        subclass = stack.pop()
+        if subclass in seen:
+            continue
+        seen.add(subclass)
         all_subclasses.append(subclass)
-        all_subclasses.extend(get_all_subclasses(subclass))
-    return all_subclasses
+        stack.extend(reversed(subclass.__subclasses__()))
+    return tuple(all_subclasses)
 
 
-def dump_block_schema(collection_id: UUID):
+def model_modules(block_classes) -> set[str]:
     """
-    Dump our blocks to the block_schema table so that the frontend can get types
+    Names of the modules defining the block classes, their base classes, and every
+    model reachable through their fields, like the extraction models used as
+    ActionTableBlock's content.
     """
-    try:
-        collection = Collections.get_by_id(collection_id)
-    except Collections.DoesNotExist:
-        print(f"Collection with id {collection_id} not found.")
-        return
+    modules = set()
+    seen = set()
+    stack = list(block_classes)
+    while stack:
+        annotation = stack.pop()
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            if annotation in seen:
+                continue
+            seen.add(annotation)
+            modules.update(
+                base.__module__
+                for base in annotation.__mro__
+                if issubclass(base, BaseModel) and base is not BaseModel
+            )
+            stack.extend(field.annotation for field in annotation.model_fields.values())
+        else:
+            # Unions, lists, Annotated and the like. Forward references name block
+            # classes, which are already on the stack.
+            stack.extend(get_args(annotation))
+    return modules
+
+
+def schema_fingerprint(block_classes) -> str:
+    """
+    Hash of everything the generated schema depends on: the block types, the source
+    of the project modules that define them and the models used in their fields,
+    and pydantic.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pydantic.VERSION.encode())
+    for cls in block_classes:
+        digest.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+
+    source_files = sorted(
+        {
+            Path(sys.modules[module_name].__file__).resolve()
+            for module_name in model_modules(block_classes)
+            if getattr(sys.modules.get(module_name), "__file__", None)
+        }
+    )
+    for source_file in source_files:
+        if source_file.is_relative_to(PROJECT_ROOT):
+            digest.update(source_file.read_bytes())
+    return digest.hexdigest()
 
-    # Dynamically import all modules in the 'schema' package to register all Block subclasses.
-    for _, module_name, _ in pkgutil.walk_packages(
-        schema.__path__, schema.__name__ + "."
-    ):
-        importlib.import_module(module_name)
+
+def dump_block_schema(collection: Union[Collections, UUID]):
+    """
+    Dump our blocks to the block_schema table so that the frontend can get types.
+    Pass the Collections record if it's already loaded to skip looking it up by id.
+    """
+    if not isinstance(collection, Collections):
+        try:
+            collection = Collections.get_by_id(collection)
+        except Collections.DoesNotExist:
+            print(f"Collection with id {collection} not found.")
+            return
+
+    import_schema_modules()
 
     # Now get all subclasses recursively
     all_blocks = get_all_subclasses(Block)
@@ -89,11 +169,22 @@ def dump_block_schema(collection_id: UUID):
     # Generate a single schema for a Union of all block types
     if not block_classes:
         return
-    union_type = Union[tuple(block_classes)]
-    adapter = TypeAdapter(union_type)
-    combined_schema = adapter.json_schema()
-    combined_schema = remove_titles(combined_schema)
-    combined_schema = replace_prefixItems(combined_schema)
+
+    # Building the schema walks every block type's fields, so reuse the last one
+    # generated from the same code.
+    cache_path = (
+        SCHEMA_CACHE_DIR / f"block_schema.{schema_fingerprint(block_classes)}.json"
+    )
+    if cache_path.exists():
+        combined_schema = orjson.loads(cache_path.read_bytes())
+    else:
+        union_type = Union[tuple(block_classes)]
+        adapter = TypeAdapter(union_type)
+        combined_schema = adapter.json_schema()
+        combined_schema = remove_titles(combined_schema)
+        combined_schema = replace_prefixItems(combined_schema)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(orjson.dumps(combined_schema))
 
     # Use get_or_create to avoid duplicates for (collection, "combined")
     block_schema_record, created = BlockSchemas.get_or_create(
@@ -118,7 +209,7 @@ if __name__ == "__main__":
     collection, _ = Collections.get_or_create(name=COLLECTION_NAME)
 
     print("🔍 Dumping block schemas...")
-    dump_block_schema(collection.id)
+    dump_block_schema(collection)
     print("✅ Done dumping block schemas.")
 
     if not database.is_closed():
@@ -1,4 +1,5 @@
 import json
+import os
 import uuid
 from typing import Optional
 
@@ -10,6 +11,10 @@ from pydantic import BaseModel, Field
 
 from etl.pymupdf_parse import PageResult, PyMuPdfItem
 
+# Blocks are built from items that were already parsed into models, so they skip
+# validation unless VALIDATE_BLOCKS is set while debugging.
+VALIDATE_BLOCKS = bool(os.environ.get("VALIDATE_BLOCKS"))
+
 
 class UnifiedBlock(BaseModel):
     match_method: str
@@ -108,6 +113,7 @@ Based on the text content, please provide the matching pairs of indexes.
         if match.pymupdf_ids:
             llama_to_pymupdf_map[match.llama_id] = [i for i in match.pymupdf_ids]
 
+    make_block = UnifiedBlock if VALIDATE_BLOCKS else UnifiedBlock.model_construct
     unified_blocks = []
     for i, llama_item in enumerate(llama_parse_page.items):
         fitz_items = []
@@ -118,7 +124,7 @@ Based on the text content, please provide the matching pairs of indexes.
             fitz_items = [pymupdf_page.content[j] for j in pymupdf_indices]
 
         unified_blocks.append(
-            UnifiedBlock(
+            make_block(
                 match_method=match_method,
                 llama_item=llama_item,
                 fitz_items=fitz_items,
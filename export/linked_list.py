@@ -0,0 +1,48 @@
+"""
+Keeping the prev_block/next_block links between a document's blocks in step with
+their document_index.
+"""
+
+from peewee import PostgresqlDatabase
+
+from export.models import Blocks, database
+
+# Point every block at its neighbours by document_index in one statement.
+REBUILD_LINKED_LIST_SQL = """
+UPDATE blocks b
+SET prev_block_id = x.prev_id, next_block_id = x.next_id
+FROM (
+    SELECT
+        id,
+        LAG(id) OVER w AS prev_id,
+        LEAD(id) OVER w AS next_id
+    FROM blocks
+    WHERE document_id = %s
+    WINDOW w AS (ORDER BY document_index)
+) x
+WHERE b.id = x.id
+"""
+
+
+def rebuild_linked_list(document):
+    """
+    Rebuild the prev_block/next_block links for the entire document from document_index.
+    """
+    if isinstance(database, PostgresqlDatabase):
+        database.execute_sql(REBUILD_LINKED_LIST_SQL, (str(document.id),))
+        return
+
+    # Without window functions, set both links on each block in memory and
+    # write them back in batches.
+    blocks = list(
+        Blocks.select(Blocks.id)
+        .where(Blocks.document == document)
+        .order_by(Blocks.document_index)
+    )
+    for i, block in enumerate(blocks):
+        block.prev_block = blocks[i - 1] if i > 0 else None
+        block.next_block = blocks[i + 1] if i + 1 < len(blocks) else None
+
+    Blocks.bulk_update(
+        blocks, fields=[Blocks.prev_block, Blocks.next_block], batch_size=500
+    )
@@ -23,7 +23,10 @@ from post_processing.insert_images import insert_images
 from post_processing.typography_check import typography_check
 from post_processing.williston_extraction_schema import ExtractedData
 from rule_registry.conversion_rules import ConversionRule, ConversionRuleRegistry
-from rule_registry.propose.propose_new_rule import propose_new_rule_node
+from rule_registry.propose.propose_new_rule import (
+    RuleProposal,
+    propose_new_rule_node,
+)
 from schema.portable_schema import BlockUnion
 from schema.tiptap_models import BaseAttrs, TiptapNode
 
@@ -39,6 +42,9 @@ class PipelineState(BaseModel):
 
     blocks: list[BlockUnion] = []
 
+    # Rule proposals made ahead of time for upcoming blocks, keyed by block id
+    pending_proposals: dict[str, RuleProposal] = {}
+
     block_index: Optional[int] = -1
     page_index: Optional[int] = -1
 
@@ -177,26 +183,20 @@ def get_rule_for_block(state: PipelineState):
         # Rule already set, no need to check again
         return {}
 
-    # Get all available conversion rules
-    rules = ConversionRuleRegistry.get_all_rules()
-
-    # Test each rule against the current block
-    for rule in rules:
-        # For now, we'll test against the first PyMuPDF item if available
-        # In the future, we might want to test against all items or use a different strategy
-        pymupdf_input = (
-            state.current_block.fitz_items[0]
-            if state.current_block.fitz_items
-            else None
-        )
+    # For now, we'll test against the first PyMuPDF item if available
+    # In the future, we might want to test against all items or use a different strategy
+    pymupdf_input = (
+        state.current_block.fitz_items[0] if state.current_block.fitz_items else None
+    )
 
-        if rule.match_condition(state.current_block.llama_item, pymupdf_input):
-            # Found a matching rule
-            new_block = state.current_block.model_copy(
-                update={"conversion_rule": rule.id}
-            )
-            state.update_current_block(new_block)
-            return {"current_block": state.current_block}
+    rule = ConversionRuleRegistry.find_matching_rule(
+        state.current_block.llama_item, pymupdf_input
+    )
+    if rule is not None:
+        # UnifiedBlock isn't frozen, so set the rule in place rather than
+        # copying the block and its fitz_items
+        state.current_block.conversion_rule = rule.id
+        return {"current_block": state.current_block}
 
     # No matching rule found
     return {}
@@ -231,20 +231,12 @@ def emit_block(state: PipelineState):
     """
     print(f"✏️  Emiting node using {state.current_block.conversion_rule}")
 
-    # Ensure the registry has been initialised and contains all rules. If the rule
-    # isn't found on the first attempt, trigger discovery and retry once before
-    # giving up.
-    rule_class: Type[ConversionRule] | None = ConversionRuleRegistry._rules.get(
+    # Only the module defining this rule needs importing. The registry falls back to
+    # full discovery if it can't locate the rule by id.
+    rule_class: Type[ConversionRule] | None = ConversionRuleRegistry.get_rule_by_id(
         state.current_block.conversion_rule
     )
 
-    if rule_class is None:
-        # (Re-)discover rules – this is idempotent and inexpensive after the first run.
-        ConversionRuleRegistry.get_all_rules()
-        rule_class = ConversionRuleRegistry._rules.get(
-            state.current_block.conversion_rule
-        )
-
     if rule_class is None:
         raise ValueError(
             f"Conversion rule '{state.current_block.conversion_rule}' not found after registry refresh"
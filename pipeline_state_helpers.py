@@ -12,8 +12,8 @@ from uuid import UUID
 from langgraph.graph.state import CompiledStateGraph
 
 
-def get_latest_output(pdf_path: str):
-    """Get the latest output JSON file from the pipeline output directory for this specific PDF."""
+def get_latest_output_path(pdf_path: str):
+    """Get the path of the latest output JSON file for this specific PDF, if any."""
     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
     output_dir = f"output/pipeline/{pdf_name}"
     if not os.path.exists(output_dir):
@@ -25,7 +25,14 @@ def get_latest_output(pdf_path: str):
         return None
 
     # Sort by modification time and get the latest
-    latest_file = max(output_files, key=os.path.getmtime)
+    return max(output_files, key=os.path.getmtime)
+
+
+def get_latest_output(pdf_path: str):
+    """Get the latest output JSON file from the pipeline output directory for this specific PDF."""
+    latest_file = get_latest_output_path(pdf_path)
+    if not latest_file:
+        return None
 
     try:
         with open(latest_file, "r", encoding="utf-8") as f:
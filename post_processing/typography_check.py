@@ -1,4 +1,5 @@
 import json
+import os
 import re
 from collections import defaultdict
 
@@ -19,6 +20,38 @@ SUPERSCRIPT_MAP = {
 }
 
 
+TYPOGRAPHY_PATH = "typography.json"
+
+# Parsed typography.json, re-read only when the file's mtime changes
+_typography_cache = {"mtime": None, "data": None}
+
+
+def load_typography():
+    try:
+        mtime = os.stat(TYPOGRAPHY_PATH).st_mtime
+    except FileNotFoundError:
+        return {"headings": {}, "paragraphs": {}}
+
+    if _typography_cache["mtime"] != mtime:
+        try:
+            with open(TYPOGRAPHY_PATH, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            return {"headings": {}, "paragraphs": {}}
+        _typography_cache["mtime"] = mtime
+        _typography_cache["data"] = data
+
+    return _typography_cache["data"]
+
+
+def save_typography(typography):
+    with open(TYPOGRAPHY_PATH, "w") as f:
+        json.dump(typography, f, indent=2, sort_keys=True)
+    # Our own write shouldn't force a re-read on the next call
+    _typography_cache["mtime"] = os.stat(TYPOGRAPHY_PATH).st_mtime
+    _typography_cache["data"] = typography
+
+
 def citation_node_for_label(state, label):
     citation_data = [
         c for c in state.custom_extracted_data.citations if c.label == label
@@ -39,199 +72,202 @@ def typography_check(state):
     print("🔬 Running Typography Check...")
 
     # Load existing typography rules
-    try:
-        with open("typography.json", "r") as f:
-            typography = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        typography = {"headings": {}, "paragraphs": {}}
+    typography = load_typography()
 
-    # Create a map of unified_block_id to fitz_items for quick lookup
+    # Create a map of unified_block_id to fitz_items for quick lookup. Only text
+    # items carry styles, so filter out images once here.
     block_id_to_fitz_items = {}
     for page in state.zipped_pages:
         for block in page.unified_blocks:
-            block_id_to_fitz_items[block.id] = block.fitz_items
+            block_id_to_fitz_items[block.id] = [
+                item for item in block.fitz_items or [] if isinstance(item, TextItem)
+            ]
 
     # Re-check nodes against the new registry and flag inconsistencies
-    for i, node in enumerate(state.blocks):
-        if isinstance(node, HeadingNode):
-            fitz_items = block_id_to_fitz_items.get(node.attrs.unified_block_id, [])
-            if not fitz_items:
-                continue
-
-            style_counts = defaultdict(int)
-            for item in fitz_items:
-                if isinstance(item, TextItem):
-                    style = (item.font, item.size)
-                    style_counts[style] += len(item.text)
-
-            if not style_counts:
-                continue
-
-            dominant_style_tuple = max(style_counts, key=style_counts.get)
-            font, size = dominant_style_tuple
-            current_style = {"font": font, "size": size}
-
-            level = str(node.attrs.level)
-            expected_styles = typography["headings"].get(level, [])
-
-            if current_style in expected_styles:
-                continue
-
-            # Mismatch detected, try to find a matching level automatically
-            matching_levels = []
-            for lvl, styles in typography["headings"].items():
-                if current_style in styles:
-                    matching_levels.append(lvl)
-
-            if len(matching_levels) == 1:
-                new_level = matching_levels[0]
-                print(
-                    f'INFO: Auto-reclassifying text "{node.content[0].text}" from Heading {level} to {new_level}.'
-                )
-                state.blocks[i].attrs.level = int(new_level)
-                continue
-
-            # Could not auto-resolve, prompt user
-            print("\n--- POTENTIAL TYPOGRAPHY MISMATCH ---")
-            print(f'Text: "{node.content[0].text}"')
-            print(f"  - Classified as: Heading {level}")
-            print(f"  - Detected Style: font='{font}', size={size}")
-            print(f"  - Expected Styles for Level {level}: {expected_styles}")
-
-            if matching_levels:
-                print(
-                    f"  - This style is ambiguous and matches Heading Level(s): {', '.join(matching_levels)}"
-                )
-
-            new_level_str = input(
-                "Enter the correct heading level, `p` to correct to a paragraph, or press Enter to keep current: "
+    # Both lists are taken before any heading is corrected, so a heading turned into
+    # a paragraph doesn't also get the citation pass.
+    headings = [
+        (i, node)
+        for i, node in enumerate(state.blocks)
+        if isinstance(node, HeadingNode)
+    ]
+    paragraphs = [node for node in state.blocks if isinstance(node, ParagraphNode)]
+    for i, node in headings:
+        fitz_items = block_id_to_fitz_items.get(node.attrs.unified_block_id, [])
+        if not fitz_items:
+            continue
+
+        style_counts = defaultdict(int)
+        for item in fitz_items:
+            style = (item.font, item.size)
+            style_counts[style] += len(item.text)
+
+        if not style_counts:
+            continue
+
+        dominant_style_tuple = max(style_counts, key=style_counts.get)
+        font, size = dominant_style_tuple
+        current_style = {"font": font, "size": size}
+
+        level = str(node.attrs.level)
+        expected_styles = typography["headings"].get(level, [])
+
+        if current_style in expected_styles:
+            continue
+
+        # Mismatch detected, try to find a matching level automatically
+        matching_levels = []
+        for lvl, styles in typography["headings"].items():
+            if current_style in styles:
+                matching_levels.append(lvl)
+
+        if len(matching_levels) == 1:
+            new_level = matching_levels[0]
+            print(
+                f'INFO: Auto-reclassifying text "{node.content[0].text}" from Heading {level} to {new_level}.'
             )
-            if new_level_str.isdigit():
-                new_level = int(new_level_str)
-                state.blocks[i].attrs.level = new_level
-                print(f"✅ Updated heading level to {new_level}.")
-
-                # Append the new style to the registry for the corrected level
-                level_styles = typography["headings"].get(str(new_level), [])
-                if current_style not in level_styles:
-                    level_styles.append(current_style)
-                    typography["headings"][str(new_level)] = level_styles
-                    with open("typography.json", "w") as f:
-                        json.dump(typography, f, indent=2, sort_keys=True)
-                    print(
-                        f"✅ Added new style to Heading {new_level} in typography.json."
-                    )
-            elif new_level_str == "p":
-                state.blocks[i] = ParagraphNode(content=state.blocks[i].content)
-        elif isinstance(node, ParagraphNode):
-            # Are there any citations?
-            # Does the unified block fitz items include any
-
-            ## Through regex unicode chars
-            if re.search(r"[¹²³⁴⁵⁶⁷⁸⁹⁰]+", node.get_text()):
-                new_content = []
-                for child in node.content:
-                    if child.type != "text":
-                        new_content.append(child)
-                        continue
-
-                    matches = re.findall(r"[¹²³⁴⁵⁶⁷⁸⁹⁰]+", child.text)
-
-                    if matches:
-                        remaining = child.text
-                        print(f"MATCHES {matches=}")
-                        for match in matches:
-                            parts = remaining.split(match, 1)
-                            new_content.append(TextNode(text=parts[0]))
-                            new_content.append(
-                                citation_node_for_label(
-                                    state,
-                                    "".join([SUPERSCRIPT_MAP[char] for char in match]),
-                                )
-                            )
-                            print(f"Remaining {parts[1]}")
-                            remaining = parts[1]
-                        if remaining:
-                            new_content.append(TextNode(text=remaining))
-                    else:
-                        new_content.append(child)
-
-                node.content = new_content
-
-            ## Through <sup> and text styles
-            fitz_items: list[TextItem] = block_id_to_fitz_items.get(
-                node.attrs.unified_block_id, []
+            node.attrs.level = int(new_level)
+            continue
+
+        # Could not auto-resolve, prompt user
+        print("\n--- POTENTIAL TYPOGRAPHY MISMATCH ---")
+        print(f'Text: "{node.content[0].text}"')
+        print(f"  - Classified as: Heading {level}")
+        print(f"  - Detected Style: font='{font}', size={size}")
+        print(f"  - Expected Styles for Level {level}: {expected_styles}")
+
+        if matching_levels:
+            print(
+                f"  - This style is ambiguous and matches Heading Level(s): {', '.join(matching_levels)}"
             )
-            if not fitz_items:
-                continue
-
-            def get_paragraph_style(font, size):
-                for style in typography["paragraphs"]:
-                    if (font, size) in [
-                        (combo["font"], combo["size"])
-                        for combo in typography["paragraphs"][style]
-                    ]:
-                        return style
-                # raise Exception(f"Unexptected font style {font}, {size}")
 
-            for item in fitz_items:
-                style = get_paragraph_style(item.font, item.size)
-
-                if style == "body":
+        new_level_str = input(
+            "Enter the correct heading level, `p` to correct to a paragraph, or press Enter to keep current: "
+        )
+        if new_level_str.isdigit():
+            new_level = int(new_level_str)
+            node.attrs.level = new_level
+            print(f"✅ Updated heading level to {new_level}.")
+
+            # Append the new style to the registry for the corrected level
+            level_styles = typography["headings"].get(str(new_level), [])
+            if current_style not in level_styles:
+                level_styles.append(current_style)
+                typography["headings"][str(new_level)] = level_styles
+                save_typography(typography)
+                print(f"✅ Added new style to Heading {new_level} in typography.json.")
+        elif new_level_str == "p":
+            state.blocks[i] = ParagraphNode(content=node.content)
+
+    for node in paragraphs:
+        # Are there any citations?
+        # Does the unified block fitz items include any
+
+        ## Through regex unicode chars
+        if re.search(r"[¹²³⁴⁵⁶⁷⁸⁹⁰]+", node.get_text()):
+            new_content = []
+            for child in node.content:
+                if child.type != "text":
+                    new_content.append(child)
                     continue
-                elif style == "citation":
-                    # Check to see if there is a citation block with this text. If there isn't we need to make one
-                    if [
-                        n
-                        for n in node.content
-                        if n.type == "citation" and n.attrs.label == item.text
-                    ]:
-                        print(f"Found matching citation for {item.text}")
-                    else:
-                        citation_data = [
-                            c
-                            for c in state.custom_extracted_data.citations
-                            if c.label == item.text
-                        ]
-                        if not citation_data:
-                            raise Exception(f"Could not find citation for {item.text}")
-                        citation_data = citation_data[0]
-                        citation_node = CitationNode(
-                            content=[TextNode(text=citation_data.source)],
-                            attrs=CitationNode.Attrs(label=item.text),
+
+                matches = re.findall(r"[¹²³⁴⁵⁶⁷⁸⁹⁰]+", child.text)
+
+                if matches:
+                    remaining = child.text
+                    print(f"MATCHES {matches=}")
+                    for match in matches:
+                        parts = remaining.split(match, 1)
+                        new_content.append(TextNode(text=parts[0]))
+                        new_content.append(
+                            citation_node_for_label(
+                                state,
+                                "".join([SUPERSCRIPT_MAP[char] for char in match]),
+                            )
                         )
+                        print(f"Remaining {parts[1]}")
+                        remaining = parts[1]
+                    if remaining:
+                        new_content.append(TextNode(text=remaining))
+                else:
+                    new_content.append(child)
+
+            node.content = new_content
+
+        ## Through <sup> and text styles
+        fitz_items: list[TextItem] = block_id_to_fitz_items.get(
+            node.attrs.unified_block_id, []
+        )
+        if not fitz_items:
+            continue
+
+        def get_paragraph_style(font, size):
+            for style in typography["paragraphs"]:
+                if (font, size) in [
+                    (combo["font"], combo["size"])
+                    for combo in typography["paragraphs"][style]
+                ]:
+                    return style
+            # raise Exception(f"Unexptected font style {font}, {size}")
+
+        for item in fitz_items:
+            style = get_paragraph_style(item.font, item.size)
+
+            if style == "body":
+                continue
+            elif style == "citation":
+                # Check to see if there is a citation block with this text. If there isn't we need to make one
+                if [
+                    n
+                    for n in node.content
+                    if n.type == "citation" and n.attrs.label == item.text
+                ]:
+                    print(f"Found matching citation for {item.text}")
+                else:
+                    citation_data = [
+                        c
+                        for c in state.custom_extracted_data.citations
+                        if c.label == item.text
+                    ]
+                    if not citation_data:
+                        raise Exception(f"Could not find citation for {item.text}")
+                    citation_data = citation_data[0]
+                    citation_node = CitationNode(
+                        content=[TextNode(text=citation_data.source)],
+                        attrs=CitationNode.Attrs(label=item.text),
+                    )
 
-                        # Find where to put it.
-                        new_children = []
-                        for child_node in node.content:
-                            # Can either be superscript OR just the number
-                            if (
-                                child_node.type == "text"
-                                and f"<sup>{item.text}</sup>" in child_node.text
-                            ):
-                                parts = child_node.text.split(f"<sup>{item.text}</sup>")
-
-                                if len(parts) != 2:
-                                    raise Exception(
-                                        f"Unexpected text format for citation, found {parts=}"
-                                    )
-
-                                new_children.extend(
-                                    [
-                                        TextNode(text=parts[0]),
-                                        citation_node,
-                                        TextNode(text=parts[1]),
-                                    ]
+                    # Find where to put it.
+                    new_children = []
+                    for child_node in node.content:
+                        # Can either be superscript OR just the number
+                        if (
+                            child_node.type == "text"
+                            and f"<sup>{item.text}</sup>" in child_node.text
+                        ):
+                            parts = child_node.text.split(f"<sup>{item.text}</sup>")
+
+                            if len(parts) != 2:
+                                raise Exception(
+                                    f"Unexpected text format for citation, found {parts=}"
                                 )
-                            else:
-                                new_children.append(child_node)
-                        print("Setting new children w citation")
-                        node.content = new_children
-                else:
-                    continue
-                    # # Find the node in content that contains this content
-                    # for child_node in node.content:
-                    #     if item.text in child_node.
-                    # raise Exception(f"Unexpected style: {style}")
+
+                            new_children.extend(
+                                [
+                                    TextNode(text=parts[0]),
+                                    citation_node,
+                                    TextNode(text=parts[1]),
+                                ]
+                            )
+                        else:
+                            new_children.append(child_node)
+                    print("Setting new children w citation")
+                    node.content = new_children
+            else:
+                continue
+                # # Find the node in content that contains this content
+                # for child_node in node.content:
+                #     if item.text in child_node.
+                # raise Exception(f"Unexpected style: {style}")
 
     return {"blocks": state.blocks}
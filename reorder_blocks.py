@@ -1,6 +1,7 @@
 import argparse
 import sys
 
+from export.linked_list import rebuild_linked_list
 from export.models import Blocks, database
 from fixme import find_document_by_chapter
 
@@ -17,18 +18,21 @@ def reorder_blocks(document, new_order):
     try:
         database.connect()
 
-        # Get all blocks for the document
-        all_blocks = (
-            Blocks.select()
+        # Only ids and positions are needed to validate and plan the reorder
+        index_rows = (
+            Blocks.select(Blocks.id, Blocks.document_index)
             .where(Blocks.document == document)
             .order_by(Blocks.document_index)
-        ).execute()
+            .tuples()
+        )
 
-        # Create a mapping of current document_index to block
-        block_map = {block.document_index: block for block in all_blocks}
+        # Create a mapping of current document_index to block id
+        block_id_map = {
+            document_index: block_id for block_id, document_index in index_rows
+        }
 
         # Validate that all blocks in new_order exist
-        missing_blocks = [idx for idx in new_order if idx not in block_map]
+        missing_blocks = [idx for idx in new_order if idx not in block_id_map]
         if missing_blocks:
             raise ValueError(
                 f"Blocks with indices {missing_blocks} not found in document"
@@ -41,22 +45,14 @@ def reorder_blocks(document, new_order):
         max_index = max(new_order)
 
         # Get blocks that come before and after our reorder range
-        blocks_before = [
-            block for block in all_blocks if block.document_index < min_index
-        ]
-        blocks_after = [
-            block for block in all_blocks if block.document_index > max_index
-        ]
-
-        # Find the blocks that will be immediately before and after our reordered section
-        block_before_range = blocks_before[-1] if blocks_before else None
-        block_after_range = blocks_after[0] if blocks_after else None
+        indices_before = [idx for idx in block_id_map if idx < min_index]
+        indices_after = [idx for idx in block_id_map if idx > max_index]
 
         print(f"📋 Reordering blocks {min_index} to {max_index}")
-        if block_before_range:
-            print(f"  Block before range: {block_before_range.document_index}")
-        if block_after_range:
-            print(f"  Block after range: {block_after_range.document_index}")
+        if indices_before:
+            print(f"  Block before range: {indices_before[-1]}")
+        if indices_after:
+            print(f"  Block after range: {indices_after[0]}")
 
         # Create a mapping from old index to new index within the range
         # We'll place the reordered blocks starting at min_index
@@ -65,49 +61,35 @@ def reorder_blocks(document, new_order):
             new_index = min_index + new_pos
             old_to_new_index[old_index] = new_index
 
+        # Blocks after our range need to shift to make room for the reordered blocks
+        shift_amount = len(new_order) - (max_index - min_index + 1)
+        indices_to_shift = indices_after if shift_amount != 0 else []
+
+        # Only load the rows that actually get saved
+        ids_to_save = [block_id_map[idx] for idx in new_order + indices_to_shift]
+        blocks_by_id = {
+            block.id: block
+            for block in Blocks.select(Blocks.id, Blocks.document_index).where(
+                Blocks.id.in_(ids_to_save)
+            )
+        }
+
         # Update document_index for blocks being reordered
         for old_index, new_index in old_to_new_index.items():
-            block = block_map[old_index]
+            block = blocks_by_id[block_id_map[old_index]]
             block.document_index = new_index
             block.save()
             print(f"  Moved block {old_index} to position {new_index}")
 
         # Update document_index for blocks that come after our range
-        # They need to shift to make room for the reordered blocks
-        if blocks_after:
-            shift_amount = len(new_order) - (max_index - min_index + 1)
-            if shift_amount != 0:
-                for block in blocks_after:
-                    block.document_index += shift_amount
-                    block.save()
-                    print(
-                        f"  Shifted block {block.document_index - shift_amount} to {block.document_index}"
-                    )
-
-        # Rebuild the linked list connections for the entire document
-        # First, clear all prev_block and next_block references
-        Blocks.update(prev_block=None, next_block=None).where(
-            Blocks.document == document
-        ).execute()
-
-        # Get all blocks again in the new order
-        all_blocks_updated = (
-            Blocks.select()
-            .where(Blocks.document == document)
-            .order_by(Blocks.document_index)
-        ).execute()
-
-        # Rebuild the linked list
-        prev_block = None
-        for block in all_blocks_updated:
-            block.prev_block = prev_block
+        for old_index in indices_to_shift:
+            block = blocks_by_id[block_id_map[old_index]]
+            block.document_index += shift_amount
             block.save()
+            print(f"  Shifted block {old_index} to {block.document_index}")
 
-            if prev_block:
-                prev_block.next_block = block
-                prev_block.save()
-
-            prev_block = block
+        # Rebuild the linked list connections for the entire document
+        rebuild_linked_list(document)
 
         print("✅ Successfully reordered blocks and rebuilt linked list")
         return True
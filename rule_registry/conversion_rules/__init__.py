@@ -3,117 +3,366 @@ Rules are how our structured PDF input gets translated to ProseMirror JSON.
 """
 
 import importlib
+import logging
+import operator
+import re
+import sys
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Literal, Optional
+from typing import Any, Callable, ClassVar, Literal, Optional
 
 from llama_cloud_services.parse.types import PageItem
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 
 from etl.pymupdf_parse import Item
+from rule_registry.conversion_rules._registry import RULE_MODULES
 from schema.tiptap_models import TiptapNode
 
+logger = logging.getLogger(__name__)
 
-class RuleCondition(BaseModel):
+
+@dataclass(frozen=True, slots=True)
+class RuleCondition:
+    # A plain dataclass rather than a model: conditions are only built when rules are
+    # defined, and pydantic still validates them as fields of ConversionRule and
+    # RuleProposal.
     source: Literal["pymupdf", "llamaparse"]
     field: str  # e.g., "font.size" or "type"
     operator: Literal["==", ">", "<", ">=", "<=", "in"]
     value: Any  # e.g., "heading", 18.0, ["section", "header"]
 
+    def __post_init__(self):
+        object.__setattr__(self, "field", sys.intern(self.field))
+
+        # Membership checks against a list are linear, so store them as a frozenset.
+        # Unhashable members have to stay in a sequence.
+        if self.operator == "in" and isinstance(self.value, (list, tuple, set)):
+            try:
+                object.__setattr__(self, "value", frozenset(self.value))
+            except TypeError:
+                pass
+
+
+def _field_getter(field: str) -> Callable[[Any], Any]:
+    """Reads `field` (dotted paths included) off an input, or None if it's missing."""
+    get_attr = operator.attrgetter(field)
+
+    def getter(input_obj):
+        try:
+            return get_attr(input_obj)
+        except AttributeError:
+            return None
+
+    return getter
+
+
+def _contains(field_value, value) -> bool:
+    return field_value in value
+
+
+OPERATORS = {
+    "==": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "in": _contains,
+}
+
+RulePredicate = Callable[[PageItem, Optional[Item]], bool]
+
+
+def _compile_condition(condition: RuleCondition) -> RulePredicate:
+    compare = OPERATORS[condition.operator]
+    getter = _field_getter(condition.field)
+    value = condition.value
+    from_llamaparse = condition.source == "llamaparse"
+
+    # A missing field can still be compared for equality.
+    if condition.operator == "==":
+        if from_llamaparse:
+
+            def predicate(llamaparse_input, pymupdf_input) -> bool:
+                return compare(getter(llamaparse_input), value)
+
+        else:
+
+            def predicate(llamaparse_input, pymupdf_input) -> bool:
+                return compare(getter(pymupdf_input), value)
+
+        return predicate
+
+    # It can't be ordered or searched for though, so treat it as a failed condition
+    # instead of raising. The same goes for values that can't be compared with the
+    # field at all, like a string field against a number, or an unhashable field
+    # looked up in a frozenset. Field types aren't known until a block is checked,
+    # so this can't be caught when the rule is registered.
+    if from_llamaparse:
+
+        def predicate(llamaparse_input, pymupdf_input) -> bool:
+            field_value = getter(llamaparse_input)
+            if field_value is None:
+                return False
+            try:
+                return compare(field_value, value)
+            except TypeError:
+                return False
+
+    else:
+
+        def predicate(llamaparse_input, pymupdf_input) -> bool:
+            # Blocks without a pymupdf item can never satisfy these conditions
+            if pymupdf_input is None:
+                return False
+            field_value = getter(pymupdf_input)
+            if field_value is None:
+                return False
+            try:
+                return compare(field_value, value)
+            except TypeError:
+                return False
+
+    return predicate
+
+
+def _condition_cost(condition: RuleCondition) -> int:
+    """Rough cost of checking a condition, so cheap equality checks can run first."""
+    if condition.operator == "==":
+        return 0
+    if condition.operator != "in":
+        return 1
+    if isinstance(condition.value, frozenset):
+        return 2
+    return 3
+
+
+def compile_conditions(
+    conditions: tuple[RuleCondition, ...],
+) -> tuple[RulePredicate, ...]:
+    """
+    Turn a rule's conditions into predicates up front, so matching a block doesn't
+    have to dispatch on the operator string for every condition.
+
+    Conditions are AND'ed, so they're ordered cheapest first rather than in
+    declaration order.
+    """
+    ordered = sorted(conditions, key=_condition_cost)
+    return tuple(_compile_condition(condition) for condition in ordered)
+
+
+IndexKey = tuple[str, str, Any]
+
+
+def _index_key(conditions: tuple[RuleCondition, ...]) -> Optional[IndexKey]:
+    """
+    The (source, field, value) of the llamaparse type a rule requires, or None if it
+    can match any type.
+    """
+    for condition in conditions:
+        if (
+            condition.source == "llamaparse"
+            and condition.field == "type"
+            and condition.operator == "=="
+        ):
+            return (condition.source, condition.field, condition.value)
+    return None
+
+
+# Matches a rule class's `id: str = "..."` default without importing its module.
+RULE_ID_PATTERN = re.compile(r'^\s+id:\s*str\s*=\s*"([^"]+)"', re.MULTILINE)
+
 
 class ConversionRuleRegistry:
     """Registry for managing conversion rules."""
 
     _rules = {}
     _initialized = False
+    # The most recently defined rule class, so callers that just ran a rule file can
+    # find its class without inspecting the module.
+    _last_registered = None
+    # Guards discovery only; lookups after it finishes don't take the lock.
+    _discover_lock = threading.Lock()
+    # Rule id -> module name, from a text scan of the rule files.
+    _rule_id_to_module: Optional[dict[str, str]] = None
+    # One shared instance per registered rule, built lazily after any registration.
+    _instances: Optional[list] = None
+    # Rule instances bucketed by the (source, field, value) of their llamaparse type
+    # condition. Every bucket also holds the general rules, which have no such
+    # condition, so registration order is kept within a bucket. Rebuilt lazily
+    # after any registration.
+    _fast_index: Optional[dict[IndexKey, list]] = None
+    _general_rules: list = []
+
+    @classmethod
+    def _register(cls, rule_id: str, rule_class):
+        cls._rules[sys.intern(rule_id)] = rule_class
+        cls._last_registered = rule_class
+        cls._instances = None
+        cls._fast_index = None
+
+    @classmethod
+    def _get_instances(cls) -> list:
+        if cls._instances is None:
+            cls._instances = [rule_class() for rule_class in cls._rules.values()]
+        return cls._instances
+
+    @classmethod
+    def _build_fast_index(cls):
+        fast_index = {}
+        general_rules = []
+        for rule in cls._get_instances():
+            key = rule._index_key
+            if key is None:
+                general_rules.append(rule)
+                for bucket in fast_index.values():
+                    bucket.append(rule)
+            else:
+                fast_index.setdefault(key, list(general_rules)).append(rule)
+        cls._general_rules = general_rules
+        cls._fast_index = fast_index
 
     @classmethod
     def _discover_and_import_rules(cls):
-        """Dynamically discover and import all rule files in this directory."""
+        """Import every rule module listed in _registry.py."""
         if cls._initialized:
             return
 
-        # Get the directory containing this __init__.py file
-        current_dir = Path(__file__).parent
+        with cls._discover_lock:
+            # Another thread may have finished discovery while we waited
+            if cls._initialized:
+                return
+
+            # The rule modules are listed in a generated file rather than found by
+            # walking this directory.
+            for module_name in RULE_MODULES:
+                # Import the module to trigger __init_subclass__ registration
+                try:
+                    importlib.import_module(module_name)
+                except ImportError as e:
+                    logger.warning("Could not import %s: %s", module_name, e)
 
-        # Find all Python files in the directory (excluding __init__.py and __pycache__)
-        for file_path in current_dir.glob("*.py"):
-            if file_path.name in ["__init__.py", "__pycache__"]:
-                continue
+            cls._initialized = True
 
-            # Import the module to trigger __init_subclass__ registration
-            module_name = f"rule_registry.conversion_rules.{file_path.stem}"
+    @classmethod
+    def _scan_rule_modules(cls) -> dict[str, str]:
+        """Map each rule id to the module defining it, without importing anything."""
+        if cls._rule_id_to_module is not None:
+            return cls._rule_id_to_module
+
+        rule_id_to_module = {}
+        for module_name in RULE_MODULES:
+            file_path = Path(__file__).parent / f"{module_name.rsplit('.', 1)[1]}.py"
+            for rule_id in RULE_ID_PATTERN.findall(file_path.read_text()):
+                rule_id_to_module[rule_id] = module_name
+
+        cls._rule_id_to_module = rule_id_to_module
+        return rule_id_to_module
+
+    @classmethod
+    def get_rule_by_id(cls, rule_id: str):
+        """
+        Get the rule class with the given id, importing only the module that defines it.
+        Falls back to full discovery if the scan didn't find it.
+        """
+        if rule_id in cls._rules:
+            return cls._rules[rule_id]
+
+        module_name = cls._scan_rule_modules().get(rule_id)
+        if module_name is not None:
             try:
                 importlib.import_module(module_name)
             except ImportError as e:
-                print(f"Warning: Could not import {module_name}: {e}")
+                logger.warning("Could not import %s: %s", module_name, e)
 
-        cls._initialized = True
+        if rule_id not in cls._rules:
+            cls._discover_and_import_rules()
+        return cls._rules.get(rule_id)
 
     @classmethod
     def register_instance(cls, rule_instance):
         """Register a rule instance (for dynamic registration)."""
         cls._discover_and_import_rules()
-        cls._rules[rule_instance.id] = type(rule_instance)
+        cls._register(rule_instance.id, type(rule_instance))
         return rule_instance
 
     @classmethod
     def get_all_rules(cls):
-        """Get all registered rules as instances."""
+        """
+        Get all registered rules as instances. Instances are shared between calls, so
+        don't mutate them.
+        """
+        cls._discover_and_import_rules()
+        return cls._get_instances()
+
+    @classmethod
+    def get_candidate_rules(cls, llama_type: Optional[str]):
+        """
+        Get instances of the rules that could match a block of the given llamaparse type,
+        in registration order. The remaining conditions still have to be checked.
+        """
         cls._discover_and_import_rules()
-        return [rule_class() for rule_class in cls._rules.values()]
+        if cls._fast_index is None:
+            cls._build_fast_index()
+        candidates = cls._fast_index.get(
+            ("llamaparse", "type", llama_type), cls._general_rules
+        )
+        return candidates
+
+    @classmethod
+    def find_matching_rule(
+        cls, llamaparse_input: PageItem, pymupdf_input: Optional[Item]
+    ) -> Optional["ConversionRule"]:
+        """Get the first registered rule that matches the input, or None."""
+        for rule in cls.get_candidate_rules(llamaparse_input.type):
+            if rule.match_condition(llamaparse_input, pymupdf_input):
+                return rule
+        return None
 
     @classmethod
     def clear(cls):
         """Clear all registered rules (useful for testing)."""
         cls._rules.clear()
+        cls._rule_id_to_module = None
+        cls._instances = None
+        cls._fast_index = None
         cls._initialized = False
 
 
 class ConversionRule(BaseModel):
+    # Rules are shared singletons in the registry, so they can't be changed.
+    model_config = ConfigDict(frozen=True)
+
     id: str  # for debugging
     description: str
-    conditions: list[RuleCondition]
+    conditions: tuple[RuleCondition, ...]
     output_node_type: str
 
+    # Set from the class's conditions when the subclass is registered.
+    _index_key: ClassVar[Optional[IndexKey]]
+    # Built from this instance's conditions in model_post_init.
+    _compiled: tuple[RulePredicate, ...] = PrivateAttr(default=())
+
     def __init_subclass__(cls, **kwargs):
         """Automatically register subclasses when they're defined."""
         super().__init_subclass__(**kwargs)
+        # Intern the strings used as lookup keys before pydantic picks them up as
+        # field defaults.
+        cls.id = sys.intern(cls.id)
+        cls.output_node_type = sys.intern(cls.output_node_type)
+        cls._index_key = _index_key(cls.conditions)
         # Register the class after it's fully defined
-        ConversionRuleRegistry._rules[cls.id] = cls
+        ConversionRuleRegistry._register(cls.id, cls)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._compiled = compile_conditions(self.conditions)
 
     def match_condition(
         cls, llamaparse_input: PageItem, pymupdf_input: Optional[Item]
     ) -> bool:
-        for condition in cls.conditions:
-            # Get the appropriate input object based on source
-            if condition.source == "llamaparse":
-                input_obj = llamaparse_input
-            else:  # pymupdf
-                input_obj = pymupdf_input
-
-            # Extract the field value using the field path
-            field_value = getattr(input_obj, condition.field, None)
-
-            # Apply the operator
-            condition_matches = False
-            if condition.operator == "==":
-                condition_matches = field_value == condition.value
-            elif condition.operator == ">":
-                condition_matches = field_value > condition.value
-            elif condition.operator == "<":
-                condition_matches = field_value < condition.value
-            elif condition.operator == ">=":
-                condition_matches = field_value >= condition.value
-            elif condition.operator == "<=":
-                condition_matches = field_value <= condition.value
-            elif condition.operator == "in":
-                condition_matches = field_value in condition.value
-
-            # If any condition fails, the rule doesn't match
-            if not condition_matches:
+        for predicate in cls._compiled:
+            if not predicate(llamaparse_input, pymupdf_input):
                 return False
-
-        # All conditions matched
         return True
 
     def construct_node(
@@ -0,0 +1,7 @@
+# Generated by rule_registry/generate_rule_modules.py. Do not edit by hand.
+
+RULE_MODULES = (
+    "rule_registry.conversion_rules.heading",
+    "rule_registry.conversion_rules.llamaparse_table_to_tiptap_table",
+    "rule_registry.conversion_rules.llamaparse_text_to_paragraph",
+)
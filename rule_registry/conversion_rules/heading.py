@@ -8,15 +8,18 @@ from schema.tiptap_models import HeadingNode, TextNode
 class HeadingConversion(ConversionRule):
     id: str = "heading"
     description: str = "standard heading element"
-    conditions: list[RuleCondition] = [
-        RuleCondition(source="llamaparse", field="type", operator="==", value="heading")
-    ]
+    conditions: tuple[RuleCondition, ...] = (
+        RuleCondition(
+            source="llamaparse", field="type", operator="==", value="heading"
+        ),
+    )
     output_node_type: str = "heading"
 
     def construct_node(
         cls, llamaparse_input: PageItem, pymupdf_inputs: list[Item]
     ) -> HeadingNode:
-        return HeadingNode(
-            attrs=HeadingNode.Attrs(level=llamaparse_input.lvl),
-            content=[TextNode(text=llamaparse_input.value or " ")],
+        # Inputs are already well-typed, so skip validation of the node tree
+        return HeadingNode.model_construct(
+            attrs=HeadingNode.Attrs.model_construct(level=llamaparse_input.lvl),
+            content=[TextNode.model_construct(text=llamaparse_input.value or " ")],
         )
@@ -8,12 +8,15 @@ from schema.tiptap_models import ParagraphNode, TextNode
 class LlamaparseTextToParagraphConversion(ConversionRule):
     id: str = "llamaparse_text_to_paragraph"
     description: str = "Converts LlamaParse text items to Tiptap paragraph nodes"
-    conditions: list[RuleCondition] = [
-        RuleCondition(source="llamaparse", field="type", operator="==", value="text")
-    ]
+    conditions: tuple[RuleCondition, ...] = (
+        RuleCondition(source="llamaparse", field="type", operator="==", value="text"),
+    )
     output_node_type: str = "paragraph"
 
     def construct_node(
         cls, llamaparse_input: PageItem, pymupdf_inputs: list[Item]
     ) -> ParagraphNode:
-        return ParagraphNode(content=[TextNode(text=llamaparse_input.value or " ")])
+        # Inputs are already well-typed, so skip validation of the node tree
+        return ParagraphNode.model_construct(
+            content=[TextNode.model_construct(text=llamaparse_input.value or " ")]
+        )
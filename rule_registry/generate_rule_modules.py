@@ -0,0 +1,42 @@
+"""
+Writes conversion_rules/_registry.py, the static list of rule modules imported at
+startup, so discovering rules doesn't have to walk the directory.
+
+Run with `python -m rule_registry.generate_rule_modules` after adding or removing a
+rule file. Rules saved by the propose graph regenerate it automatically.
+"""
+
+from pathlib import Path
+
+RULES_DIR = Path(__file__).parent / "conversion_rules"
+REGISTRY_PATH = RULES_DIR / "_registry.py"
+
+
+def find_rule_modules() -> list[str]:
+    modules = []
+    for file_path in sorted(RULES_DIR.glob("*.py")):
+        # Skip the package itself, generated files, and rules still under review
+        if file_path.name.startswith(("_", "temp_")):
+            continue
+        modules.append(f"rule_registry.conversion_rules.{file_path.stem}")
+    return modules
+
+
+def generate_rule_modules() -> str:
+    lines = [
+        "# Generated by rule_registry/generate_rule_modules.py. Do not edit by hand.",
+        "",
+        "RULE_MODULES = (",
+    ]
+    lines.extend(f'    "{module}",' for module in find_rule_modules())
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def write_rule_modules():
+    REGISTRY_PATH.write_text(generate_rule_modules())
+
+
+if __name__ == "__main__":
+    write_rule_modules()
+    print(f"✅ Rule modules written to {REGISTRY_PATH}")
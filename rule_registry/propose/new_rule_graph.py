@@ -1,7 +1,11 @@
+import functools
+import os
 import subprocess
+import tempfile
 from pathlib import Path
 from typing import Annotated, Optional, TypedDict
 
+import orjson
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
@@ -10,6 +14,7 @@ from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 
 from etl.zip_llama_pymupdf import UnifiedBlock
+from rule_registry.generate_rule_modules import write_rule_modules
 from rule_registry.propose.propose_new_rule import (
     RuleProposal,
     _query_similar_rules_impl,
@@ -26,7 +31,9 @@ def query_similar_rules(block: UnifiedBlock) -> str:
     Queries the rule registry for existing rules that are most similar to the given block.
     This should be one of the first tools you use to get context.
     """
-    return _query_similar_rules_impl(block)
+    return orjson.dumps(
+        _query_similar_rules_impl(block), option=orjson.OPT_INDENT_2
+    ).decode()
 
 
 @tool
@@ -100,13 +107,29 @@ class GraphState(TypedDict):
     user_choice: Optional[str]
 
 
+@functools.cache
+def _scratch_dir() -> Path:
+    """
+    Directory for rule files being tested or reviewed, kept out of the package so
+    editors, watchers and the import system don't see them.
+    """
+    return Path(tempfile.mkdtemp(prefix="rule_propose_"))
+
+
 # ---- Graph Nodes ----
 def agent_node(state: GraphState):
     """
     The primary agent node. It decides which tool to use, or whether to propose a final rule.
     """
     print("---AGENT: THINKING---")
-    response = llm_with_tools.invoke(state["messages"])
+    # Stream so the agent's reasoning shows up as it's generated instead of after
+    # the whole response lands. Chunks add up to the full message, tool calls included.
+    response = None
+    for chunk in llm_with_tools.stream(state["messages"]):
+        if isinstance(chunk.content, str) and chunk.content:
+            print(chunk.content, end="", flush=True)
+        response = chunk if response is None else response + chunk
+    print()
     return {"messages": [response]}
 
 
@@ -157,7 +180,7 @@ def test_generated_code(state: GraphState):
     if not code:
         return {"test_result": "Error: No code was generated."}
 
-    temp_file_path = Path(f"temp_rule_test_{rule_id}.py")
+    temp_file_path = _scratch_dir() / f"temp_rule_test_{rule_id}.py"
     try:
         temp_file_path.write_text(code)
         test_success, message = test_rule_with_block(temp_file_path, block)
@@ -183,12 +206,16 @@ def human_review(state: GraphState):
         return {"user_choice": "reject"}
 
     rule_id = state["rule_proposal"].id
-    temp_file_path = Path(f"rule_registry/conversion_rules/temp_review_{rule_id}.py")
+    temp_file_path = _scratch_dir() / f"temp_review_{rule_id}.py"
     temp_file_path.write_text(code_to_review)
+    written_mtime = temp_file_path.stat().st_mtime
+
+    print("\nFinal proposed rule is ready for review.")
+    # Don't wait for the editor to exit, it stays open across saves. The choice
+    # below is what moves the review along.
+    subprocess.Popen(["cursor", str(temp_file_path)])
 
     while True:
-        print("\nFinal proposed rule is ready for review.")
-        subprocess.call(["cursor", str(temp_file_path)])
         print("\nPlease review the code. Options:")
         print("  a - Accept and save.")
         print("  e - I have edited the file. Test the new version.")
@@ -196,8 +223,17 @@ def human_review(state: GraphState):
         choice = input("Choose (a/e/r): ").lower().strip()
 
         if choice == "a":
+            # Edits saved in the editor have to pass the test before they're accepted
+            if temp_file_path.stat().st_mtime != written_mtime:
+                print("The file was edited, testing the new version first.")
+                edited_code = temp_file_path.read_text()
+                return {"user_choice": "edit", "final_code": edited_code}
             return {"user_choice": "accept"}
         elif choice == "e":
+            # Only read the file back once it has actually been saved
+            if temp_file_path.stat().st_mtime == written_mtime:
+                print("The file hasn't been saved since it was opened.")
+                continue
             edited_code = temp_file_path.read_text()
             return {"user_choice": "edit", "final_code": edited_code}
         elif choice == "r":
@@ -216,11 +252,14 @@ def save_rule(state: GraphState):
     rule_registry_dir = Path("rule_registry/conversion_rules")
     rule_registry_dir.mkdir(exist_ok=True)
     final_file_path = rule_registry_dir / f"{rule_id}.py"
-    final_file_path.write_text(final_code)
+    # Write next to the destination and rename, so the rule file appears atomically
+    partial_file_path = final_file_path.with_suffix(".py.partial")
+    partial_file_path.write_text(final_code)
+    os.replace(partial_file_path, final_file_path)
     print(f"✅ Rule saved to: {final_file_path}")
-    Path(f"rule_registry/conversion_rules/temp_review_{rule_id}.py").unlink(
-        missing_ok=True
-    )
+    (_scratch_dir() / f"temp_review_{rule_id}.py").unlink(missing_ok=True)
+    # Add the new rule to the static list of modules imported at startup
+    write_rule_modules()
     return {"file_path": str(final_file_path)}
 
 
@@ -311,6 +350,13 @@ def after_human_review(state: GraphState):
         return END
 
 
+def route_entry(state: GraphState):
+    """Skip the agent when a proposal was already supplied (e.g. from a batched request)."""
+    if state.get("rule_proposal"):
+        return "generate_code"
+    return "agent"
+
+
 # ---- Graph Definition ----
 def build_graph():
     workflow = StateGraph(GraphState)
@@ -327,7 +373,9 @@ def build_graph():
     workflow.add_node("save_rule", save_rule)
 
     # Edges
-    workflow.set_entry_point("agent")
+    workflow.set_conditional_entry_point(
+        route_entry, {"agent": "agent", "generate_code": "generate_code"}
+    )
     workflow.add_edge("agent", "process_agent_response")
     workflow.add_conditional_edges(
         "process_agent_response",
@@ -361,8 +409,13 @@ def build_graph():
 
 
 # --- Main execution logic ---
-def propose_new_rule_graph(block: UnifiedBlock):
-    """The main function to run the rule proposal graph."""
+def propose_new_rule_graph(
+    block: UnifiedBlock, rule_proposal: Optional[RuleProposal] = None
+):
+    """
+    The main function to run the rule proposal graph. If a rule_proposal is given,
+    the agent is skipped and the proposal goes straight to code generation and review.
+    """
     app = build_graph()
 
     initial_prompt = f"""
@@ -384,7 +437,12 @@ Generating a new rule for {block.model_dump_json(indent=2)}
 
     # Start the graph execution
     final_state = app.invoke(
-        {"messages": initial_messages, "block": block, "retries_left": 3}
+        {
+            "messages": initial_messages,
+            "block": block,
+            "rule_proposal": rule_proposal,
+            "retries_left": 3,
+        }
     )
 
     return {
@@ -0,0 +1,232 @@
+"""
+Cache of accepted rules keyed by the block they were written for, so blocks that
+look like ones we've already written a rule for can reuse it without the LLM.
+
+A block only reaches ProposeNewRule when no registered rule matches it, so a
+cached rule is only reused when every one of its conditions that doesn't look at
+the text still matches the block. Then only a condition on the text kept the rule
+from matching, and the rule is assigned to the block directly.
+
+Lookups try an exact fingerprint of the block first: its llamaparse type and the
+styles of its pymupdf text items. On a miss, the block's text is embedded and
+compared against cached blocks of the same llamaparse type.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from etl.pymupdf_parse import TextItem
+from etl.zip_llama_pymupdf import UnifiedBlock
+from rule_registry.conversion_rules import (
+    ConversionRule,
+    ConversionRuleRegistry,
+    compile_conditions,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+CACHE_PATH = PROJECT_ROOT / ".cache" / "accepted_rules.pkl"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 64
+# Normalized embeddings are stored as int8, scaled so each component spans -127..127
+EMBEDDING_SCALE = 127
+# The (source, field) of conditions on a block's text. A cached rule can be reused
+# when only these conditions fail.
+TEXT_FIELDS = frozenset(
+    {("llamaparse", "value"), ("llamaparse", "md"), ("pymupdf", "text")}
+)
+
+
+def block_fingerprint(block: UnifiedBlock) -> str:
+    """Hash of the parts of a block a rule's conditions can look at, minus the text."""
+    styles = sorted(
+        {
+            (item.font, item.size, item.color)
+            for item in block.fitz_items or []
+            if isinstance(item, TextItem)
+        }
+    )
+    key_data = json.dumps(
+        {
+            "type": block.llama_item.type,
+            "lvl": getattr(block.llama_item, "lvl", None),
+            "styles": styles,
+        }
+    )
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def _embedding_model():
+    # Imported lazily: the model is only needed once an exact lookup misses
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def _embed_many(texts: list[str]) -> np.ndarray:
+    """Embed all texts in one encode call, so tokenization and inference are batched."""
+    return _embedding_model().encode(
+        texts, batch_size=EMBEDDING_BATCH_SIZE, normalize_embeddings=True
+    )
+
+
+def _quantize(embeddings: np.ndarray) -> np.ndarray:
+    """Store normalized embeddings as int8, a quarter of the size of float32."""
+    return np.round(embeddings * EMBEDDING_SCALE).astype(np.int8)
+
+
+def matches_apart_from_text(rule: ConversionRule, block: UnifiedBlock) -> bool:
+    """Whether the block satisfies every condition of the rule not on its text."""
+    predicates = compile_conditions(
+        tuple(
+            condition
+            for condition in rule.conditions
+            if (condition.source, condition.field) not in TEXT_FIELDS
+        )
+    )
+    pymupdf_input = block.fitz_items[0] if block.fitz_items else None
+    return all(predicate(block.llama_item, pymupdf_input) for predicate in predicates)
+
+
+def _reusable(rule_id: str, block: UnifiedBlock) -> bool:
+    for rule in ConversionRuleRegistry.get_candidate_rules(block.llama_item.type):
+        if rule.id == rule_id:
+            return matches_apart_from_text(rule, block)
+    return False
+
+
+class LRUEmbeddingCache:
+    """
+    LRU cache of accepted rule ids with an expiry time, persisted to disk so it
+    survives between runs.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 512,
+        ttl: float = 7 * 24 * 60 * 60,
+        threshold: float = 0.95,
+        path: Path = CACHE_PATH,
+    ):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self.path = path
+        # fingerprint -> (llama type, int8 text embedding, rule id, time cached)
+        self._entries: Optional[OrderedDict] = None
+
+    def _load(self) -> OrderedDict:
+        if self._entries is None:
+            try:
+                with open(self.path, "rb") as f:
+                    self._entries = pickle.load(f)
+            except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+                self._entries = OrderedDict()
+        return self._entries
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename it into place, so parallel runs never see
+        # a partly written cache
+        with tempfile.NamedTemporaryFile(
+            dir=self.path.parent, prefix=self.path.name, delete=False
+        ) as f:
+            pickle.dump(self._entries, f)
+        os.replace(f.name, self.path)
+
+    def _purge_expired(self) -> OrderedDict:
+        entries = self._load()
+        now = time.time()
+        for key in [key for key, entry in entries.items() if now - entry[3] > self.ttl]:
+            del entries[key]
+        return entries
+
+    def get(self, block: UnifiedBlock) -> Optional[str]:
+        return self.get_many([block])[0]
+
+    def get_many(self, blocks: list[UnifiedBlock]) -> list[Optional[str]]:
+        """
+        Look up an accepted rule id for each block. Blocks without an exact
+        fingerprint hit are embedded together in one batch before comparing them to
+        the cache. Rules that are no longer registered are dropped from the cache, and
+        rules with a condition besides the text that the block fails are skipped.
+        """
+        entries = self._purge_expired()
+        for key in [
+            key
+            for key, entry in entries.items()
+            if ConversionRuleRegistry.get_rule_by_id(entry[2]) is None
+        ]:
+            del entries[key]
+
+        results: list[Optional[str]] = [None] * len(blocks)
+        to_embed = []
+        for i, block in enumerate(blocks):
+            fingerprint = block_fingerprint(block)
+            if fingerprint in entries and _reusable(entries[fingerprint][2], block):
+                entries.move_to_end(fingerprint)
+                results[i] = entries[fingerprint][2]
+            elif block.llama_item.value and any(
+                entry[0] == block.llama_item.type for entry in entries.values()
+            ):
+                to_embed.append(i)
+
+        if to_embed:
+            embeddings = _quantize(
+                _embed_many([blocks[i].llama_item.value for i in to_embed])
+            )
+            for i, embedding in zip(to_embed, embeddings):
+                llama_type = blocks[i].llama_item.type
+                candidates = [
+                    (key, entry)
+                    for key, entry in entries.items()
+                    if entry[0] == llama_type
+                ]
+                # Embeddings are normalized, so the dot product is the cosine
+                # similarity. Accumulate in int32 so the int8 products can't overflow.
+                matrix = np.stack([entry[1] for _, entry in candidates])
+                similarities = (
+                    matrix.astype(np.int32) @ embedding.astype(np.int32)
+                ) / EMBEDDING_SCALE**2
+                for best in np.argsort(-similarities):
+                    if similarities[best] < self.threshold:
+                        break
+                    key, entry = candidates[best]
+                    if _reusable(entry[2], blocks[i]):
+                        entries.move_to_end(key)
+                        results[i] = entry[2]
+                        break
+
+        for rule_id in results:
+            if rule_id is not None:
+                print(
+                    f"♻️  Reusing rule {rule_id} for a block like one it was written for"
+                )
+        return results
+
+    def put(self, block: UnifiedBlock, rule_id: str):
+        entries = self._purge_expired()
+        fingerprint = block_fingerprint(block)
+        entries[fingerprint] = (
+            block.llama_item.type,
+            _quantize(_embed_many([block.llama_item.value or ""]))[0],
+            rule_id,
+            time.time(),
+        )
+        entries.move_to_end(fingerprint)
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+        self._save()
+
+
+proposal_cache = LRUEmbeddingCache()
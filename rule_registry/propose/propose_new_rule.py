@@ -1,15 +1,30 @@
-import importlib.util
+import asyncio
+import functools
+import hashlib
 import json
+import logging
 import sys
+import types
 from pathlib import Path
+from typing import Optional
 
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers.openai_tools import PydanticToolsParser
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
 from doc_server.helpers import append_to_document
 from etl.zip_llama_pymupdf import UnifiedBlock
 from rule_registry.conversion_rules import ConversionRuleRegistry, RuleCondition
+from rule_registry.propose.tiptap_node_summary import generate_node_types_summary
 from schema.tiptap_models import TiptapNode
 
+logger = logging.getLogger(__name__)
+
+# How many unmatched blocks to send to the LLM in a single proposal request.
+PROPOSAL_BATCH_SIZE = 5
+
 
 class RuleProposal(BaseModel):
     id: str = Field(
@@ -29,28 +44,62 @@ class RuleProposal(BaseModel):
     )
 
 
+class RuleProposalBatch(BaseModel):
+    proposals: list[RuleProposal] = Field(
+        description="One RuleProposal per block, in the same order the blocks were given."
+    )
+
+
 # ---- Tool to query existing rules that match ----
-def _query_similar_rules_impl(block: UnifiedBlock, top_k: int = 5) -> str:
+def _query_similar_rules_impl(block: UnifiedBlock, top_k: int = 5) -> list[dict]:
     """
     Internal implementation of query_similar_rules without tool decoration.
+
+    Rules are ranked by how many of their conditions the block satisfies. A rule
+    whose conditions are all satisfied is an exact_match and can convert the block.
     """
-    all_rules = ConversionRuleRegistry.get_all_rules()
-    matches = []
-    for rule in all_rules:
-        try:
-            if rule.match_condition(
-                block.llama_item, block.fitz_items[0] if block.fitz_items else None
-            ):
-                matches.append(
-                    {
-                        "id": rule.id,
-                        "description": rule.description,
-                        "output_node_type": rule.output_node_type,
-                    }
-                )
-        except Exception:
+    pymupdf_input = block.fitz_items[0] if block.fitz_items else None
+    scored = []
+    for rule in ConversionRuleRegistry.get_candidate_rules(block.llama_item.type):
+        satisfied = sum(
+            predicate(block.llama_item, pymupdf_input) for predicate in rule._compiled
+        )
+        if not satisfied and rule._compiled:
             continue
-    return json.dumps(matches[:top_k], indent=2)
+        total = len(rule._compiled)
+        scored.append(
+            (
+                satisfied / total if total else 1.0,
+                {
+                    "id": rule.id,
+                    "description": rule.description,
+                    "output_node_type": rule.output_node_type,
+                    "exact_match": satisfied == total,
+                },
+            )
+        )
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return [match for _, match in scored[:top_k]]
+
+
+# Rule classes from temp rule files, keyed by path and source hash, so re-testing
+# unchanged code skips compiling and running the module again.
+_compiled_cache: dict[tuple[str, str], Optional[type]] = {}
+
+
+def _load_rule_class(temp_file_path: Path) -> Optional[type]:
+    """Run a temp rule file and return the ConversionRule subclass it defines."""
+    source = temp_file_path.read_text()
+    key = (str(temp_file_path), hashlib.sha256(source.encode()).hexdigest())
+    if key not in _compiled_cache:
+        module = types.ModuleType("temp_rule")
+        module.__file__ = str(temp_file_path)
+        # Registered before exec so pydantic can resolve the classes' __module__
+        sys.modules["temp_rule"] = module
+        ConversionRuleRegistry._last_registered = None
+        exec(compile(source, str(temp_file_path), "exec"), module.__dict__)
+        _compiled_cache[key] = ConversionRuleRegistry._last_registered
+    return _compiled_cache[key]
 
 
 def test_rule_with_block(temp_file_path: Path, block: UnifiedBlock) -> tuple[bool, str]:
@@ -59,21 +108,9 @@ def test_rule_with_block(temp_file_path: Path, block: UnifiedBlock) -> tuple[boo
     Returns a tuple of (success: bool, message: str).
     """
     try:
-        # Dynamically import the temporary rule file
-        spec = importlib.util.spec_from_file_location("temp_rule", temp_file_path)
-        temp_module = importlib.util.module_from_spec(spec)
-        sys.modules["temp_rule"] = temp_module
-        spec.loader.exec_module(temp_module)
-
-        # Find the ConversionRule class in the module
-        rule_class = None
-        for attr_name in dir(temp_module):
-            attr = getattr(temp_module, attr_name)
-            if hasattr(attr, "__bases__") and any(
-                "ConversionRule" in str(base) for base in attr.__bases__
-            ):
-                rule_class = attr
-                break
+        # Dynamically import the temporary rule file. Defining the class registers
+        # it, so there's no need to search the module for it.
+        rule_class = _load_rule_class(temp_file_path)
 
         if not rule_class:
             return False, "Could not find ConversionRule class in the file"
@@ -93,9 +130,8 @@ def test_rule_with_block(temp_file_path: Path, block: UnifiedBlock) -> tuple[boo
         # Check if the result is a valid TiptapNode
 
         if isinstance(result_node, TiptapNode):
-            message = (
-                f"Rule generated valid {type(result_node).__name__}: {result_node}"
-            )
+            message = f"Rule generated valid {type(result_node).__name__}"
+            logger.debug("Rule %s generated %s", rule_instance.id, result_node)
             # Append to document
             append_to_document([result_node])
             return True, message
@@ -110,14 +146,23 @@ def test_rule_with_block(temp_file_path: Path, block: UnifiedBlock) -> tuple[boo
 
 
 # ------- Conversion class ----------
+def _condition_value_source(value) -> str:
+    """
+    Python source for a condition's value. RuleCondition turns "in" values into
+    frozensets, so those are written back as a sorted list.
+    """
+    if isinstance(value, frozenset):
+        value = sorted(value, key=repr)
+    return repr(value)
+
+
 def generate_conversion_class(rule: RuleProposal) -> str:
-    print("Generating class")
-    # Format each condition line
-    condition_lines = ",\n        ".join(
-        [
-            f'RuleCondition(source="{c.source}", field="{c.field}", operator="{c.operator}", value="{c.value}")'
-            for c in rule.conditions
-        ]
+    logger.debug("Generating class for rule %s", rule.id)
+    # Format each condition line. Each ends in its own comma, so a rule without
+    # conditions still gives a valid (empty) tuple.
+    condition_lines = "".join(
+        f'\n        RuleCondition(source="{c.source}", field="{c.field}", operator="{c.operator}", value={_condition_value_source(c.value)}),'
+        for c in rule.conditions
     )
 
     return f'''from rule_registry.conversion_rules import ConversionRule, RuleCondition
@@ -129,9 +174,8 @@ from etl.pymupdf_parse import Item
 class {rule.id.title().replace("_", "")}Conversion(ConversionRule):
     id: str = "{rule.id}"
     description: str = "{rule.description}"
-    conditions: list[RuleCondition] = [
-        {condition_lines}
-    ]
+    conditions: tuple[RuleCondition, ...] = ({condition_lines}
+    )
     output_node_type: str = "{rule.output_node_type}"
 
     def construct_node(cls, llamaparse_input: PageItem, pymupdf_inputs: list[Item]) -> {rule.output_node_type.title()}Node:
@@ -139,27 +183,202 @@ class {rule.id.title().replace("_", "")}Conversion(ConversionRule):
 '''
 
 
+# ---- Batched proposals ----
+BATCH_PROPOSAL_PROMPT = """
+You are an expert in document parsing. Each 'UnifiedBlock' below needs to be converted into a Tiptap node.
+For every block, propose a `RuleProposal` that can be used to perform this conversion.
+Return exactly one proposal per block, in the same order as the blocks are given.
+
+The blocks to convert are:
+{blocks}
+"""
+
+SINGLE_PROPOSAL_PROMPT = """
+You are an expert in document parsing. A 'UnifiedBlock' of data needs to be converted into a Tiptap node.
+Propose a `RuleProposal` that can be used to perform this conversion.
+
+The block to convert is:
+{block}
+"""
+
+
+def _make_proposal_chain(template: str, input_variable: str, output_model):
+    """
+    The model has to answer by calling a tool built from output_model. The tool's
+    description carries the node types summary, so the schema and summary are the
+    same tool definition on every request and the message only holds the blocks.
+    """
+    proposal_tool = convert_to_openai_tool(output_model)
+    proposal_tool["function"]["description"] = (
+        "Submit the rule proposal. These are the Tiptap node types that can be "
+        f"created:\n{generate_node_types_summary()}"
+    )
+    my_llm = ChatOpenAI(model="gpt-4o", temperature=0).bind_tools(
+        [proposal_tool], tool_choice=output_model.__name__
+    )
+    prompt = PromptTemplate(template=template, input_variables=[input_variable])
+    return (
+        prompt
+        | my_llm
+        | PydanticToolsParser(tools=[output_model], first_tool_only=True)
+    )
+
+
+@functools.cache
+def _batch_proposal_chain():
+    return _make_proposal_chain(BATCH_PROPOSAL_PROMPT, "blocks", RuleProposalBatch)
+
+
+@functools.cache
+def _single_proposal_chain():
+    return _make_proposal_chain(SINGLE_PROPOSAL_PROMPT, "block", RuleProposal)
+
+
+def propose_rules_for_blocks(
+    blocks: list[UnifiedBlock],
+) -> list[Optional[RuleProposal]]:
+    """
+    Ask the LLM for one RuleProposal per block in a single request, so the prompt
+    prefix and node type summary are only sent once for the whole batch.
+
+    If the response can't be parsed or doesn't line up with the blocks, each block
+    is proposed for in its own request instead, with the requests sent concurrently.
+    Blocks that still get no proposal are None.
+    """
+    try:
+        result: Optional[RuleProposalBatch] = _batch_proposal_chain().invoke(
+            {
+                "blocks": json.dumps(
+                    [block.model_dump(mode="json") for block in blocks], indent=2
+                ),
+            }
+        )
+    except Exception as e:
+        print(f"⚠️ Batched rule proposal failed, falling back to single blocks: {e}")
+        return asyncio.run(apropose_rules_concurrently(blocks))
+
+    if result is None:
+        print(
+            "⚠️ Batched rule proposal returned no proposals, falling back to single blocks"
+        )
+        return asyncio.run(apropose_rules_concurrently(blocks))
+
+    if len(result.proposals) != len(blocks):
+        print(
+            f"⚠️ Got {len(result.proposals)} proposals for {len(blocks)} blocks, falling back to single blocks"
+        )
+        return asyncio.run(apropose_rules_concurrently(blocks))
+
+    return result.proposals
+
+
+async def apropose_rules_concurrently(
+    blocks: list[UnifiedBlock],
+) -> list[Optional[RuleProposal]]:
+    """
+    Ask the LLM for a RuleProposal for each block in its own request, awaiting them
+    together so the wait is for the slowest request rather than all of them in turn.
+    A request that fails gives None for its block.
+    """
+    results = await _single_proposal_chain().abatch(
+        [{"block": block.model_dump_json(indent=2)} for block in blocks],
+        return_exceptions=True,
+    )
+
+    proposals = []
+    for block, result in zip(blocks, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Rule proposal failed for block {block.id}: {result}")
+            proposals.append(None)
+        else:
+            proposals.append(result)
+    return proposals
+
+
+def _upcoming_unmatched_blocks(state, limit: int) -> list[UnifiedBlock]:
+    """
+    Up to `limit` blocks after the current one that no existing rule can convert and
+    that don't already have a proposal waiting for them.
+    """
+    blocks = []
+    for page_index in range(state.page_index, len(state.zipped_pages)):
+        unified_blocks = state.zipped_pages[page_index].unified_blocks
+        start = state.block_index + 1 if page_index == state.page_index else 0
+        for block_index in range(start, len(unified_blocks)):
+            if len(blocks) >= limit:
+                return blocks
+            block = unified_blocks[block_index]
+            if (
+                block.conversion_rule is None
+                and block.id not in state.pending_proposals
+                and ConversionRuleRegistry.find_matching_rule(
+                    block.llama_item, block.fitz_items[0] if block.fitz_items else None
+                )
+                is None
+            ):
+                blocks.append(block)
+    return blocks
+
+
 # ---- Main entry point ----
 def propose_new_rule_node(state):
     """
     Function that extracts the current block from PipelineState
     and generates a new conversion rule using the new agentic graph.
+
+    Upcoming blocks that no rule matches yet are proposed for in the same LLM
+    request. Their proposals wait in the pipeline state, keyed by block id, until
+    the pipeline reaches them. By then a rule accepted for an earlier block may
+    already cover them, in which case RuleForBlock assigns it and the proposal
+    is never used.
+
+    Blocks that look like one an accepted rule was written for, and fail only that
+    rule's conditions on the text, are given the rule from the proposal cache
+    without the LLM or the graph.
     """
     from rule_registry.propose.new_rule_graph import propose_new_rule_graph
+    from rule_registry.propose.proposal_cache import proposal_cache
 
-    # Extract the current block from the state
     block = state.current_block
+    pending_proposals = state.pending_proposals
+    proposal = pending_proposals.pop(block.id, None)
+    upcoming_blocks = (
+        _upcoming_unmatched_blocks(state, PROPOSAL_BATCH_SIZE - 1)
+        if proposal is None
+        else []
+    )
 
-    # Generate the rule by invoking the graph
-    result = propose_new_rule_graph(block)
+    # A block that looks like one we've already accepted a rule for gets that
+    # rule, as long as only the rule's conditions on the text failed
+    cached_rule_ids = proposal_cache.get_many([block] + upcoming_blocks)
+    if cached_rule_ids[0] is not None:
+        block.conversion_rule = cached_rule_ids[0]
+        return {"current_block": block, "pending_proposals": pending_proposals}
 
-    print(f"Graph finished with result: {result}")
+    # Upcoming blocks with a cached rule get it when they're reached, so only the
+    # rest need proposals
+    upcoming_blocks = [
+        upcoming_block
+        for upcoming_block, rule_id in zip(upcoming_blocks, cached_rule_ids[1:])
+        if rule_id is None
+    ]
+    if upcoming_blocks:
+        proposals = propose_rules_for_blocks([block] + upcoming_blocks)
+        proposal = proposals[0]
+        for upcoming_block, upcoming_proposal in zip(upcoming_blocks, proposals[1:]):
+            if upcoming_proposal is not None:
+                pending_proposals[upcoming_block.id] = upcoming_proposal
 
-    new_block = state.current_block.model_copy(
-        update={"conversion_rule": result["rule"].id if result.get("rule") else None}
-    )
+    # Generate the rule by invoking the graph. Without a proposal, the agent
+    # writes one.
+    result = propose_new_rule_graph(block, proposal)
+
+    logger.debug("Graph finished with result: %s", result)
+
+    if result.get("file_path"):
+        proposal_cache.put(block, result["rule"].id)
 
-    state.update_current_block(new_block)
+    block.conversion_rule = result["rule"].id if result.get("rule") else None
 
     # Return the result in the format expected by the pipeline
-    return {"current_block": state.current_block}
+    return {"current_block": block, "pending_proposals": pending_proposals}
@@ -1,4 +1,13 @@
-from typing import ForwardRef, List, Literal, Union, get_args, get_origin
+import functools
+from typing import (
+    Annotated,
+    ForwardRef,
+    List,
+    Literal,
+    Union,
+    get_args,
+    get_origin,
+)
 
 from pydantic import BaseModel
 
@@ -12,6 +21,9 @@ def extract_type_group_definitions():
     for name in ["InlineNode", "BlockNode", "ListNode"]:
         if hasattr(tiptap_models, name):
             group = getattr(tiptap_models, name)
+            # Tagged unions wrap the Union in Annotated
+            if get_origin(group) is Annotated:
+                group = get_args(group)[0]
             types = get_args(group)
             resolved = []
             for t in types:
@@ -25,6 +37,13 @@ def extract_type_group_definitions():
     return type_groups
 
 
+# The type groups and node classes are fixed once schema.tiptap_models is imported.
+TYPE_GROUPS = extract_type_group_definitions()
+NODE_CLASSES = tuple(sorted(TiptapNode.__subclasses__(), key=lambda c: c.__name__))
+
+
+# Node models share field types (TextNode, Attrs, ...), so each is only formatted once.
+@functools.lru_cache(maxsize=None)
 def format_type(annotation) -> str:
     origin = get_origin(annotation)
     args = get_args(annotation)
@@ -41,6 +60,8 @@ def format_type(annotation) -> str:
         return "null"
     elif isinstance(annotation, ForwardRef):
         return annotation.__forward_arg__
+    elif origin is Annotated:
+        return format_type(args[0])
     elif origin is Union:
         non_none = [a for a in args if a is not type(None)]
         if len(non_none) == 1:
@@ -64,12 +85,20 @@ def extract_literal_type(field) -> str:
     return "unknown"
 
 
+_model_fields_cache: dict[type, str] = {}
+
+
 def format_model_fields(model: BaseModel) -> str:
+    if model in _model_fields_cache:
+        return _model_fields_cache[model]
+
     parts = []
     for field_name, field in model.model_fields.items():
         formatted_type = format_type(field.annotation)
         parts.append(f"{field_name}: {formatted_type}")
-    return "{ " + ", ".join(parts) + " }"
+    formatted = "{ " + ", ".join(parts) + " }"
+    _model_fields_cache[model] = formatted
+    return formatted
 
 
 def summarize_node_class(cls):
@@ -99,16 +128,18 @@ def summarize_node_class(cls):
 
 
 # === OUTPUT GLUE ===
+@functools.cache
 def generate_node_types_summary():
+    """Built once per process, since the node classes can't change after import."""
     # 1. Group definitions
     group_lines = ["Type groups:"]
-    for name, types in extract_type_group_definitions().items():
+    for name, types in TYPE_GROUPS.items():
         group_lines.append(f"- {name} = {' | '.join(types)}")
     group_section = "\n".join(group_lines)
 
     # 2. Node summaries
     summaries = []
-    for cls in sorted(TiptapNode.__subclasses__(), key=lambda c: c.__name__):
+    for cls in NODE_CLASSES:
         summaries.append(summarize_node_class(cls))
     nodes_section = "\n\n".join(summaries)
 
@@ -2,24 +2,54 @@
 Run pipeline and save for every file in the provided directory.
 """
 
+import logging
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 from pipeline import process
 from save_latest import save_output
 
+
+def _run_one(file_path: str, resume_latest: bool):
+    print(f"Processing file: {file_path}")
+    process(file_path, resume_latest)
+    save_output(file_path)
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python run_all.py <input_dir> [--resume-latest]")
+        print("Usage: python run_all.py <input_dir> [--resume-latest] [--workers N]")
         sys.exit(1)
 
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
+
     input_dir = sys.argv[1]
     resume_latest = "--resume-latest" in sys.argv
+    # PDFs are independent, but worker processes have no stdin for the typography
+    # and rule review prompts, so only run in parallel when no prompts are expected.
+    workers = (
+        int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 1
+    )
+
+    # Every PDF in the input directory (non-recursive), smallest first so quick
+    # files finish early
+    with os.scandir(input_dir) as entries:
+        pdf_entries = [
+            entry
+            for entry in entries
+            if entry.name.lower().endswith(".pdf") and entry.is_file()
+        ]
+    pdf_paths = [
+        entry.path for entry in sorted(pdf_entries, key=lambda e: e.stat().st_size)
+    ]
 
-    # Iterate over every file in the input directory (non-recursive)
-    for filename in os.listdir(input_dir):
-        file_path = os.path.join(input_dir, filename)
-        if os.path.isfile(file_path) and filename.lower().endswith(".pdf"):
-            print(f"Processing file: {file_path}")
-            process(file_path, resume_latest)
-            save_output(file_path)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(
+                executor.map(partial(_run_one, resume_latest=resume_latest), pdf_paths)
+            )
+    else:
+        for file_path in pdf_paths:
+            _run_one(file_path, resume_latest)
@@ -9,15 +9,18 @@ PGPASSWORD=postgres uv run -m pwiz -e postgresql -H localhost -p 54322 -u postgr
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
 from dotenv import load_dotenv
-from peewee import fn
+from peewee import chunked, fn
 from supabase import Client, create_client
 
+from export.linked_list import rebuild_linked_list
 from export.models import Blocks, Collections, Documents, database
 from pipeline import PipelineState
-from pipeline_state_helpers import resume_from_latest
+from pipeline_state_helpers import get_latest_output_path
 
 load_dotenv()
 
@@ -26,6 +29,15 @@ key: str = os.environ.get("SUPABASE_KEY")
 supabase: Client = create_client(url, key)
 
 COLLECTION_NAME = "Williston Town Plan"
+INSERT_BATCH_SIZE = 500
+IMAGE_UPLOAD_WORKERS = 16
+IMAGE_LIST_LIMIT = 10000
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+# "12 | Title" or "12 Title" -> chapter number and title
+CHAPTER_TITLE_PATTERN = re.compile(r"^(\d+)(?:\s+\|)?\s+(.*)$")
+WHITESPACE_PATTERN = re.compile(r"\s")
+SLUG_DISALLOWED_PATTERN = re.compile(r"[^a-z|-]")
 
 
 def dump_images(file_name: str, document_id: str):
@@ -41,12 +53,13 @@ def dump_images(file_name: str, document_id: str):
         print(f"Warning: No images directory found at {local_images_path}")
         return
 
-    # Get all image files in the directory
-    image_files = (
-        list(local_images_path.glob("*.png"))
-        + list(local_images_path.glob("*.jpg"))
-        + list(local_images_path.glob("*.jpeg"))
-    )
+    # Get all image files in the directory in one pass
+    with os.scandir(local_images_path) as entries:
+        image_files = [
+            Path(entry.path)
+            for entry in entries
+            if os.path.splitext(entry.name)[1] in IMAGE_SUFFIXES and entry.is_file()
+        ]
 
     if not image_files:
         print(f"No image files found in {local_images_path}")
@@ -54,41 +67,76 @@ def dump_images(file_name: str, document_id: str):
 
     print(f"Found {len(image_files)} images to upload for document {document_id}")
 
-    uploaded_count = 0
-    for image_file in image_files:
-        try:
-            # Construct the bucket path: images/{document_id}/{file_name}/{image_name}
-            bucket_path = f"{document_id}/{file_name}/{image_file.name}"
+    # Re-runs keep the same document id, so images already in the bucket with the
+    # same size don't need uploading again
+    existing_sizes = _uploaded_image_sizes(f"{document_id}/{file_name}")
+    image_files = [
+        image_file
+        for image_file in image_files
+        if existing_sizes.get(image_file.name) != image_file.stat().st_size
+    ]
+    if not image_files:
+        print("  👌 All images are already uploaded.")
+        return
 
-            # Read the image file
-            with open(image_file, "rb") as f:
-                image_data = f.read()
+    # Each upload is its own HTTPS request, so send them concurrently
+    with ThreadPoolExecutor(max_workers=IMAGE_UPLOAD_WORKERS) as executor:
+        uploaded = executor.map(
+            partial(_upload_image, document_id=document_id, file_name=file_name),
+            image_files,
+        )
+        uploaded_count = sum(uploaded)
+
+    print(
+        f"Successfully uploaded {uploaded_count}/{len(image_files)} images for document {document_id}"
+    )
+
+
+def _uploaded_image_sizes(folder: str) -> dict[str, int]:
+    """Map the name of each image already in the bucket folder to its size."""
+    try:
+        objects = supabase.storage.from_("images").list(
+            folder, {"limit": IMAGE_LIST_LIMIT}
+        )
+    except Exception as e:
+        print(f"  ⚠️ Could not list existing images, uploading all of them: {e}")
+        return {}
+    return {obj["name"]: (obj.get("metadata") or {}).get("size") for obj in objects}
 
-            # Upload to Supabase storage
+
+def _upload_image(image_file: Path, document_id: str, file_name: str) -> bool:
+    """Upload one image to images/{document_id}/{file_name}/{image_name}."""
+    try:
+        # Construct the bucket path: images/{document_id}/{file_name}/{image_name}
+        bucket_path = f"{document_id}/{file_name}/{image_file.name}"
+
+        # Hand the open file to the client so the upload streams it rather than
+        # holding the whole image in memory
+        with open(image_file, "rb") as f:
             supabase.storage.from_("images").upload(
                 path=bucket_path,
-                file=image_data,
+                file=f,
                 file_options={
                     "content-type": "image/png"
                     if image_file.suffix == ".png"
-                    else "image/jpeg"
+                    else "image/jpeg",
+                    # A changed image replaces the one already at this path
+                    "upsert": "true",
                 },
             )
 
-            print(f"  ✅ Uploaded {image_file.name} to {bucket_path}")
-            uploaded_count += 1
+        print(f"  ✅ Uploaded {image_file.name} to {bucket_path}")
+        return True
 
-        except Exception as e:
-            print(f"  ❌ Failed to upload {image_file.name}: {str(e)}")
-
-    print(
-        f"Successfully uploaded {uploaded_count}/{len(image_files)} images for document {document_id}"
-    )
+    except Exception as e:
+        print(f"  ❌ Failed to upload {image_file.name}: {str(e)}")
+        return False
 
 
-def update_image_src_attributes(block_data, document_id: str):
+def update_image_src_attributes(block_data, prefix: str):
     """
-    Update image src attributes to include document ID prefix.
+    Update image src attributes to include the document's image prefix,
+    images/{document_id}/.
     Handles both 'image' blocks and 'imageHeader' blocks with image content.
     """
     if (
@@ -97,10 +145,9 @@ def update_image_src_attributes(block_data, document_id: str):
         and hasattr(block_data.attrs, "src")
     ):
         # For image blocks, update the src attribute directly
-        if block_data.attrs.src and not block_data.attrs.src.startswith(
-            f"images/{document_id}/"
-        ):
-            block_data.attrs.src = f"images/{document_id}/{block_data.attrs.src}"
+        src = block_data.attrs.src
+        if src and not src.startswith(prefix):
+            block_data.attrs.src = prefix + src
 
     elif block_data.type == "imageHeader" and block_data.content:
         # For imageHeader blocks, update src attributes in all image content
@@ -110,12 +157,9 @@ def update_image_src_attributes(block_data, document_id: str):
                 and hasattr(content_item, "attrs")
                 and hasattr(content_item.attrs, "src")
             ):
-                if content_item.attrs.src and not content_item.attrs.src.startswith(
-                    f"images/{document_id}/"
-                ):
-                    content_item.attrs.src = (
-                        f"images/{document_id}/{content_item.attrs.src}"
-                    )
+                src = content_item.attrs.src
+                if src and not src.startswith(prefix):
+                    content_item.attrs.src = prefix + src
 
 
 def create_or_get_document(
@@ -156,12 +200,13 @@ def create_or_get_document(
 
 
 def save_output(pdf_path):
-    state_dict = resume_from_latest(pdf_path)
-    if not state_dict:
+    latest_file = get_latest_output_path(pdf_path)
+    if not latest_file:
         print(f"No saved state found for {pdf_path}")
         sys.exit(1)
 
-    state = PipelineState(**state_dict)
+    # Validate straight from the JSON bytes, without building a dict first
+    state = PipelineState.model_validate_json(Path(latest_file).read_bytes())
 
     if not state.blocks:
         print("No blocks found in the pipeline state. Exiting.")
@@ -175,69 +220,59 @@ def save_output(pdf_path):
             return " ".join(x.capitalize() for x in s.split())
 
         if first_node_text:
-            matches = re.match(r"^(\d+)(?:\s+\|)?\s+(.*)$", first_node_text)
+            matches = CHAPTER_TITLE_PATTERN.match(first_node_text)
 
             if matches:
                 title = matches.group(2)
                 label = f"Chapter {matches.group(1)}"
             else:
-                title = state.blocks[0].get_text()
+                title = first_node_text
                 label = ""
         else:
             title = "Unknown"
             label = "Chapter ?"
 
         title = titlecase(title.strip())
-        slug = re.sub(r"\s", "-", title.lower())
-        slug = re.sub(r"[^a-z|-]", "", slug)
+        slug = WHITESPACE_PATTERN.sub("-", title.lower())
+        slug = SLUG_DISALLOWED_PATTERN.sub("", slug)
 
         document = create_or_get_document(
             title=title, slug=slug, collection_name=COLLECTION_NAME, label=label
         )
 
-        prev_block_record = None
+        image_prefix = f"images/{document.id}/"
+        rows = []
         for i, block_data in enumerate(state.blocks):
-            print(f"  Inserting block {i + 1}/{len(state.blocks)}: {block_data.type}")
-
             # Update image src attributes to include document ID prefix
-            update_image_src_attributes(block_data, str(document.id))
-
-            attrs_json = block_data.attrs.model_dump() if block_data.attrs else None
-            if hasattr(block_data, "content"):
-                if isinstance(block_data.content, dict):
-                    content_json = block_data.content
-                elif hasattr(block_data.content, "model_dump"):
-                    # Single Pydantic model (like ActionTable)
-                    content_json = block_data.content.model_dump()
-                elif block_data.content and hasattr(
-                    block_data.content[0], "model_dump"
-                ):
-                    # List of Pydantic models
-                    content_json = (
-                        [c.model_dump() for c in block_data.content]
-                        if block_data.content
-                        else None
-                    )
-                else:
-                    content_json = block_data.content
-            else:
-                content_json = {}
-
-            block_record = Blocks.create(
-                document=document,
-                document_index=i,
-                type=block_data.type,
-                attrs=attrs_json,
-                content=content_json,
-                text=block_data.get_text(),
-                prev_block=prev_block_record,
-            )
+            update_image_src_attributes(block_data, image_prefix)
 
-            if prev_block_record:
-                prev_block_record.next_block = block_record
-                prev_block_record.save()
+            # Dump attrs and content in one pydantic-core call rather than dumping
+            # each child model from Python. serialize_as_any keeps the fields of
+            # the actual child node types.
+            dumped = block_data.model_dump(
+                include={"attrs", "content"}, serialize_as_any=True
+            )
+            attrs_json = dumped.get("attrs")
+            content_json = dumped["content"] if "content" in dumped else {}
+
+            rows.append(
+                {
+                    "document": document,
+                    "document_index": i,
+                    "type": block_data.type,
+                    "attrs": attrs_json,
+                    "content": content_json,
+                    "text": block_data.get_text(),
+                }
+            )
 
-            prev_block_record = block_record
+        # Insert the blocks in multi-row batches, then link them up by
+        # document_index in one statement rather than saving each block twice.
+        print(f"  Inserting {len(rows)} blocks")
+        with database.atomic():
+            for batch in chunked(rows, INSERT_BATCH_SIZE):
+                Blocks.insert_many(batch).execute()
+            rebuild_linked_list(document)
 
         print("✅ Done inserting blocks.")
 
@@ -1,9 +1,31 @@
-from typing import List, Literal, Optional
+from typing import ClassVar, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+
+# How Block.get_text treats a node type
+TEXT_KIND_NONE = 0  # No text or content fields, so never any text
+TEXT_KIND_OWN = 1  # Defines its own get_text
+TEXT_KIND_TREE = 2  # Text comes from its text field or its content
 
 
 class Block(BaseModel):
+    # Build each node type's validator the first time it's used rather than at
+    # import, once every forward reference between node types can be resolved.
+    model_config = ConfigDict(defer_build=True)
+
+    # Worked out once per class, so walking a tree doesn't have to probe each node
+    _text_kind: ClassVar[int] = TEXT_KIND_TREE
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs):
+        super().__pydantic_init_subclass__(**kwargs)
+        if cls.get_text is not Block.get_text:
+            cls._text_kind = TEXT_KIND_OWN
+        elif "text" in cls.model_fields or "content" in cls.model_fields:
+            cls._text_kind = TEXT_KIND_TREE
+        else:
+            cls._text_kind = TEXT_KIND_NONE
+
     def get_text(self) -> Optional[str]:
         """Get the text field"""
         # Leaf nodes usually store their textual value in the `text` attribute.
@@ -11,36 +33,29 @@ class Block(BaseModel):
         if isinstance(text_val, str):
             return text_val
 
-        # If this node has children (the `content` field), recursively extract
-        # their text values and concatenate them with spaces.  We purposefully
-        # keep the implementation very tolerant so that it works for any node
-        # structure produced by Tiptap.
-        content = getattr(self, "content", None)
-        if not content:
-            return None
-
-        # Ensure we are always working with an iterable of blocks.
-        if not isinstance(content, (list, tuple)):
-            content = [content]
-
+        # Otherwise collect the text of every descendant and concatenate them with
+        # spaces. We purposefully keep the implementation very tolerant so that it
+        # works for any node structure produced by Tiptap. The tree is walked with
+        # an explicit stack, so deeply nested documents don't recurse.
         collected: List[str] = []
-
-        for child in content:
-            if child is None:
+        stack = _child_blocks(self)[::-1]
+        while stack:
+            node = stack.pop()
+            kind = node._text_kind
+            if kind == TEXT_KIND_NONE:
                 continue
 
-            # Recursively obtain text from child nodes.
-            if isinstance(child, Block):
-                child_text = child.get_text()
-                if child_text:
-                    collected.append(child_text)
-            # Sometimes the list can be nested (e.g. tables). Handle that too.
-            elif isinstance(child, (list, tuple)):
-                for grand_child in child:
-                    if isinstance(grand_child, Block):
-                        grand_text = grand_child.get_text()
-                        if grand_text:
-                            collected.append(grand_text)
+            # Node types with their own get_text decide how their text is joined
+            if kind == TEXT_KIND_OWN:
+                node_text = node.get_text()
+            else:
+                node_text = getattr(node, "text", None)
+                if not isinstance(node_text, str):
+                    stack.extend(reversed(_child_blocks(node)))
+                    continue
+
+            if node_text:
+                collected.append(node_text)
 
         if collected:
             return " ".join(collected)
@@ -48,6 +63,34 @@ class Block(BaseModel):
         return None
 
 
+def _is_block(value) -> bool:
+    # A class attribute lookup, cheaper than isinstance through pydantic's ABC
+    # metaclass
+    return hasattr(value.__class__, "_text_kind")
+
+
+def _child_blocks(node: Block) -> List[Block]:
+    """The blocks in a node's `content` field, in document order."""
+    content = getattr(node, "content", None)
+    if not content:
+        return []
+
+    # Ensure we are always working with an iterable of blocks.
+    if content.__class__ is not list and content.__class__ is not tuple:
+        content = [content]
+
+    children: List[Block] = []
+    for child in content:
+        if _is_block(child):
+            children.append(child)
+        # Sometimes the list can be nested (e.g. tables). Handle that too.
+        elif child.__class__ is list or child.__class__ is tuple:
+            children.extend(
+                grand_child for grand_child in child if _is_block(grand_child)
+            )
+    return children
+
+
 # # Resolve forward references so that the `content` field properly recognises the
 # # `Block` type within the Union definitions.
 # Block.update_forward_refs()
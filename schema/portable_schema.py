@@ -1,6 +1,7 @@
-from typing import Literal, Tuple, Union
+import functools
+from typing import Annotated, Literal, Tuple, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 
 from post_processing.williston_extraction_schema import ActionTable, StrategyItem
 from schema.block import Block
@@ -86,24 +87,37 @@ class CustomBlock(Block):
     attrs: Attrs
 
 
-BlockUnion = Union[
-    GoalItemBlock,
-    FactItemBlock,
-    BlockquoteNode,
-    BulletlistNode,
-    CodeblockNode,
-    HeadingNode,
-    HorizontalruleNode,
-    ImageNode,
-    ImageheaderNode,
-    OrderedlistNode,
-    ParagraphNode,
-    TableNode,
-    CustomBlock,
-    ActionTableBlock,
+# Tagged on each block's unique `type` literal
+BlockUnion = Annotated[
+    Union[
+        GoalItemBlock,
+        FactItemBlock,
+        BlockquoteNode,
+        BulletlistNode,
+        CodeblockNode,
+        HeadingNode,
+        HorizontalruleNode,
+        ImageNode,
+        ImageheaderNode,
+        OrderedlistNode,
+        ParagraphNode,
+        TableNode,
+        CustomBlock,
+        ActionTableBlock,
+    ],
+    Field(discriminator="type"),
 ]
 
-# After all models are defined, rebuild the models that use forward references
-GoalItemBlock.model_rebuild()
-FactItemBlock.model_rebuild()
-ActionTableBlock.model_rebuild()
+
+@functools.cache
+def block_adapter() -> TypeAdapter:
+    """
+    The TypeAdapter for BlockUnion, built on first use and then shared, so the union's
+    schema is only built once. Not built at import, since blocks defer their builds.
+    """
+    return TypeAdapter(BlockUnion)
+
+
+def validate_block(data) -> BlockUnion:
+    """Validate a single block, e.g. a dict loaded from JSON."""
+    return block_adapter().validate_python(data)
@@ -1,6 +1,6 @@
-from typing import List, Optional, Union
+from typing import Annotated, List, Optional, Union
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, field_validator
 from typing_extensions import Literal
 
 from schema.block import BaseAttrs, Block
@@ -11,20 +11,29 @@ class TiptapNode(Block):
     pass
 
 
-BlockNode = Union[
-    "BlockquoteNode",
-    "BulletlistNode",
-    "CodeblockNode",
-    "HeadingNode",
-    "HorizontalruleNode",
-    "ImageNode",
-    "ImageheaderNode",
-    "OrderedlistNode",
-    "ParagraphNode",
-    "TableNode",
+# Every node has a unique `type` literal, so the unions are tagged on it and a
+# node is validated against its own model instead of trying each member in turn.
+BlockNode = Annotated[
+    Union[
+        "BlockquoteNode",
+        "BulletlistNode",
+        "CodeblockNode",
+        "HeadingNode",
+        "HorizontalruleNode",
+        "ImageNode",
+        "ImageheaderNode",
+        "OrderedlistNode",
+        "ParagraphNode",
+        "TableNode",
+    ],
+    Field(discriminator="type"),
+]
+ListNode = Annotated[
+    Union["BulletlistNode", "OrderedlistNode"], Field(discriminator="type")
+]
+InlineNode = Annotated[
+    Union["HardbreakNode", "TextNode", "CitationNode"], Field(discriminator="type")
 ]
-ListNode = Union["BulletlistNode", "OrderedlistNode"]
-InlineNode = Union["HardbreakNode", "TextNode", "CitationNode"]
 
 
 class ParagraphNode(Block):
@@ -87,7 +96,8 @@ class ListitemNode(Block):
     type: Literal["listItem"] = "listItem"
     content: List[Union["BlockNode", "ParagraphNode"]]
 
-    @validator("content")
+    @field_validator("content")
+    @classmethod
     def check_content(cls, v):
         if not v:
             return v
@@ -121,6 +131,9 @@ class TextNode(Block):
 
     attrs: Attrs = Attrs()
 
+    def get_text(self) -> str:
+        return self.text
+
 
 class CitationNode(Block):
     type: Literal["citation"] = "citation"
@@ -154,7 +167,7 @@ class TableNode(Block):
     attrs: Attrs = Attrs()
 
     def get_text(self) -> Optional[str]:
-        return "\n".join([child.get_text() for child in self.content])
+        return "\n".join(child.get_text() or "" for child in self.content)
 
 
 class TablerowNode(Block):
@@ -163,7 +176,8 @@ class TablerowNode(Block):
     attrs: Optional[BaseAttrs] = None
 
     def get_text(self) -> Optional[str]:
-        return " | ".join([child.get_text() for child in self.content])
+        # Empty cells have no text, so they join as empty strings
+        return " | ".join(child.get_text() or "" for child in self.content)
 
 
 class TablecellNode(Block):
@@ -1,3 +1,4 @@
+import functools
 import json
 import re
 from dataclasses import dataclass
@@ -6,28 +7,30 @@ from typing import List, Optional
 
 
 # === AST NODES ===
-@dataclass
+# Frozen, with tuples for children, so equal subexpressions hash the same and their
+# Python types can be cached.
+@dataclass(frozen=True)
 class NodeExpr:
     pass
 
 
-@dataclass
+@dataclass(frozen=True)
 class NamedNode(NodeExpr):
     name: str
     quantifier: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class Sequence(NodeExpr):
-    elements: List[NodeExpr]
+    elements: tuple[NodeExpr, ...]
 
 
-@dataclass
+@dataclass(frozen=True)
 class Alternation(NodeExpr):
-    options: List[NodeExpr]
+    options: tuple[NodeExpr, ...]
 
 
-@dataclass
+@dataclass(frozen=True)
 class Group(NodeExpr):
     expr: NodeExpr
     quantifier: Optional[str] = None
@@ -35,6 +38,7 @@ class Group(NodeExpr):
 
 # === TOKENIZER ===
 TOKEN_RE = re.compile(r"\w+|[()*+?|]")
+QUANTIFIERS = frozenset("*+?")
 
 
 def tokenize(expr: str) -> List[str]:
@@ -51,29 +55,44 @@ def parse_tokens(tokens: List[str]) -> NodeExpr:
                 break
             elif token == "(":
                 inner, index = parse_expr(index + 1)
-                if index < len(tokens) and tokens[index] in "*+?":
+                if index < len(tokens) and tokens[index] in QUANTIFIERS:
                     inner = Group(expr=inner, quantifier=tokens[index])
                     index += 1
                 seq.append(inner)
             elif token == "|":
-                left = Sequence(seq) if len(seq) > 1 else seq[0]
+                left = Sequence(tuple(seq)) if len(seq) > 1 else seq[0]
                 right, index = parse_expr(index + 1)
-                return Alternation([left, right]), index
+                return Alternation((left, right)), index
             else:
                 quantifier = None
-                if index + 1 < len(tokens) and tokens[index + 1] in "*+?":
+                if index + 1 < len(tokens) and tokens[index + 1] in QUANTIFIERS:
                     quantifier = tokens[index + 1]
                     index += 1
                 seq.append(NamedNode(name=token, quantifier=quantifier))
             index += 1
-        return Sequence(seq) if len(seq) > 1 else seq[0], index + 1
+        return Sequence(tuple(seq)) if len(seq) > 1 else seq[0], index + 1
 
     ast, _ = parse_expr(0)
     return ast
 
 
+@functools.lru_cache(maxsize=512)
+def parse_expr(expr: str) -> NodeExpr:
+    """
+    Tokenize and parse a content expression. Many nodes share expressions like
+    "block+" or "inline*", so each one is only parsed once.
+    """
+    return parse_tokens(tokenize(expr))
+
+
 # === PYTHON TYPE TRANSLATION ===
 def to_python_type(node: NodeExpr, group_map: dict) -> str:
+    return _python_type(node)
+
+
+@functools.lru_cache(maxsize=256)
+def _python_type(node: NodeExpr) -> str:
+    """Python type for an AST node. Shared subexpressions are only translated once."""
     if isinstance(node, NamedNode):
         base_type = f"'{node.name.title()}Node'"
         if node.quantifier == "+":
@@ -85,7 +104,7 @@ def to_python_type(node: NodeExpr, group_map: dict) -> str:
         else:
             return base_type
     elif isinstance(node, Group):
-        inner = to_python_type(node.expr, group_map)
+        inner = _python_type(node.expr)
         if node.quantifier == "+":
             return f"List[{inner}]"
         elif node.quantifier == "*":
@@ -95,10 +114,10 @@ def to_python_type(node: NodeExpr, group_map: dict) -> str:
         else:
             return inner
     elif isinstance(node, Sequence):
-        types = [to_python_type(e, group_map) for e in node.elements]
+        types = [_python_type(e) for e in node.elements]
         return f"Tuple[{', '.join(types)}]" if len(types) > 1 else types[0]
     elif isinstance(node, Alternation):
-        return f"Union[{', '.join(to_python_type(opt, group_map) for opt in node.options)}]"
+        return f"Union[{', '.join(_python_type(opt) for opt in node.options)}]"
     else:
         raise TypeError(f"Unsupported node type: {node}")
 
@@ -107,8 +126,7 @@ def to_python_type(node: NodeExpr, group_map: dict) -> str:
 def parse_content_expr(expr: str | None, group_map: dict) -> str | None:
     if not expr:
         return None
-    tokens = tokenize(expr)
-    ast = parse_tokens(tokens)
+    ast = parse_expr(expr)
     base_type = to_python_type(ast, group_map)
 
     # In ProseMirror, content is always an array. Use Tuple for fixed-length sequences:
@@ -155,13 +173,13 @@ def python_type_from_default(value):
         return "Optional[Any]"  # fallback, could be improved
 
 
+@functools.lru_cache(maxsize=512)
 def generate_content_validator(content_expr: str) -> str | None:
     """Generate a validator for constrained content expressions like 'paragraph actionItem*'"""
     if not content_expr:
         return None
 
-    tokens = tokenize(content_expr)
-    ast = parse_tokens(tokens)
+    ast = parse_expr(content_expr)
 
     # Check if this is a sequence with quantifiers
     if isinstance(ast, Sequence):
@@ -186,7 +204,8 @@ def generate_content_validator(content_expr: str) -> str | None:
                 var_type, quantifier = variable_parts[0]
 
                 validator_lines = [
-                    "    @validator('content')",
+                    "    @field_validator('content')",
+                    "    @classmethod",
                     "    def check_content(cls, v):",
                     "        if not v:",
                 ]
@@ -228,8 +247,11 @@ def generate_node_types(schema_json: dict) -> str:
     # Generate base and group types
     lines = [
         "# DO NOT EDIT. This file was automatically generated by generate_prose_mirror_classes.py.",
+        # Annotations are resolved when a model is first validated, since Block
+        # defers building validators
+        "from __future__ import annotations",
         "from typing import List, Optional, Union, Tuple, Any",
-        "from pydantic import BaseModel, validator",
+        "from pydantic import BaseModel, field_validator",
         "from typing_extensions import Literal",
         "from schema.block import Block",
     ]
@@ -301,7 +323,5 @@ def generate_node_types(schema_json: dict) -> str:
 if __name__ == "__main__":
     schema_path = Path("tiptap/editor_schema.json")
     schema = json.loads(schema_path.read_text())
-    output = generate_node_types(schema)
-    with open("schema/tiptap_models.py", "w") as f:
-        f.write(output)
+    Path("schema/tiptap_models.py").write_text(generate_node_types(schema))
     print("✅ Type definitions written to tiptap_models.py")
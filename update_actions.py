@@ -1,5 +1,4 @@
-import json
-
+import orjson
 from dotenv import load_dotenv
 
 from export.models import Blocks, Documents, database
@@ -11,8 +10,8 @@ def update_action_table(chapter: int):
     old_data_path = (
         f"old_data/2025 TOWN PLAN DRAFT Chapter {chapter:02} v.07-15-2025.json"
     )
-    with open(old_data_path) as f:
-        chap_data = json.load(f)
+    with open(old_data_path, "rb") as f:
+        chap_data = orjson.loads(f.read())
         old_actions = chap_data["actions"]
 
     database.connect()
@@ -22,21 +21,24 @@ def update_action_table(chapter: int):
 
         action_block = Blocks.get(document=document, type="action_table")
 
+        # Look up old entries by label. Built from the end so the first entry wins
+        # if a label repeats.
+        old_strats_by_label = {
+            s["label"]: s for s in reversed(old_actions["strategies"])
+        }
+
         for strat in action_block.content["strategies"]:
             print(strat["label"])
-            old_strat = next(
-                (s for s in old_actions["strategies"] if s["label"] == strat["label"]),
-                None,
-            )
+            old_strat = old_strats_by_label.get(strat["label"])
 
             if not old_strat:
                 continue
 
+            old_actions_by_label = {
+                a["label"]: a for a in reversed(old_strat["actions"])
+            }
             for action in strat["actions"]:
-                old_action = next(
-                    (a for a in old_strat["actions"] if a["label"] == action["label"]),
-                    None,
-                )
+                old_action = old_actions_by_label.get(action["label"])
 
                 if not old_action:
                     continue